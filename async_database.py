@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Database
+
+# Worker threads, and so the most SQLite connections the facade opens
+DB_THREADS = 8
+
+# Database methods that only read; cancelling or timing one out aborts its
+# statement inside SQLite. Writes always run to completion (their result is
+# dropped) so a cancelled caller never leaves a half-applied change.
+READ_METHODS = (
+    "get_all_members", "get_member", "get_member_if_matches", "search_members", "search_top",
+    "count_members", "query_members", "get_membership_types", "get_member_periods",
+    "get_revenue", "get_revenue_by_plan", "get_dashboard_stats", "visit_history",
+    "members_version", "get_meta", "get_branches",
+)
+WRITE_METHODS = (
+    "add_member", "insert_members", "update_member", "update_member_dates", "delete_member",
+    "check_in", "flush_check_ins", "expire_members", "set_meta", "invalidate_cache",
+    "set_member_branch", "add_branch",
+)
+
+class _Job:
+    """One call on the worker threads, tracked so it can be skipped or interrupted"""
+    def __init__(self, fn, args, kwargs, interruptible):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.interruptible = interruptible
+        self._lock = threading.Lock()
+        self._thread_id = None
+        self._cancelled = False
+
+    def run(self, db, on_finished):
+        try:
+            with self._lock:
+                if self._cancelled:
+                    return None
+                self._thread_id = threading.get_ident()
+            try:
+                return self.fn(db, *self.args, **self.kwargs)
+            finally:
+                with self._lock:
+                    self._thread_id = None
+        finally:
+            on_finished()
+
+    def cancel(self, db):
+        """Skip the call if it has not started; interrupt it if it is a running read"""
+        with self._lock:
+            self._cancelled = True
+            if self._thread_id is not None and self.interruptible:
+                # Held under the lock so the thread cannot move on to another call first
+                db.interrupt(self._thread_id)
+
+class AsyncDatabase:
+    """Awaitable Database for asyncio services.
+
+    Calls run on a private pool of `max_workers` threads. Database hands each
+    thread its own pooled connection, so the event loop never blocks on
+    SQLite and the number of connections stays bounded. At most
+    `max_concurrency` calls are queued or running at once; further callers
+    wait their turn on the loop. `timeout` (seconds, None for no limit) applies
+    to every call unless overridden with the `timeout=` keyword, and covers
+    the wait for a slot as well as the query. A timed out or cancelled read is
+    interrupted inside SQLite.
+
+    Every method in READ_METHODS and WRITE_METHODS is available as a
+    coroutine with the Database signature; `run` takes any `fn(db, ...)`.
+    iter_members is not wrapped since its cursor is bound to one thread.
+    """
+    def __init__(self, db_file="fitgym.db", max_workers=DB_THREADS, max_concurrency=None,
+                 timeout=None, profile=None, db=None):
+        self.db = db or Database(db_file, profile=profile)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers * 4
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fitgym-async-db")
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def run(self, fn, *args, timeout=None, interruptible=False, **kwargs):
+        """Run `fn(db, *args, **kwargs)` on a worker thread and return its result.
+
+        Raises asyncio.TimeoutError after `timeout` seconds (default: the
+        facade's timeout). Pass `interruptible=True` for read-only calls so a
+        timeout or cancellation also aborts the running query.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        job = _Job(fn, args, kwargs, interruptible)
+        if timeout is None:
+            return await self._submit(job)
+        return await asyncio.wait_for(self._submit(job), timeout)
+
+    async def _submit(self, job):
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        released = functools.partial(loop.call_soon_threadsafe, self._slots.release)
+        try:
+            future = loop.run_in_executor(self._executor, job.run, self.db, released)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A consumed result keeps abandoned calls from logging "never retrieved"
+        future.add_done_callback(_consume_result)
+        try:
+            # Shielded so the job itself always runs and gives its slot back
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            job.cancel(self.db)
+            raise
+
+    def close(self):
+        """Wait for running calls, flush buffered check-ins and close the database"""
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+def _consume_result(future):
+    if not future.cancelled():
+        future.exception()
+
+def _method(name, interruptible):
+    database_method = getattr(Database, name)
+
+    @functools.wraps(database_method)
+    async def method(self, *args, timeout=None, **kwargs):
+        return await self.run(database_method, *args, timeout=timeout, interruptible=interruptible, **kwargs)
+    return method
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabase, _name, _method(_name, True))
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabase, _name, _method(_name, False))
+del _name
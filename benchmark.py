@@ -0,0 +1,290 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from database import Database, DAYS_FILTERS, MEMBER_SORTS
+
+SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_SIZES = (1000, 10000, 100000)
+REPEAT = 5
+PAGE_SIZE = 100
+WRITE_OPERATIONS = 200
+INSERT_BATCH = 10000
+
+FIRST_NAMES = (
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas",
+    "Sarah", "Chris", "Karen", "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Sandra",
+    "Mark", "Ashley", "Steven", "Emily", "Paul", "Donna", "Andrew", "Michelle", "Joshua",
+    "Carol", "Kevin", "Amanda", "Brian", "Melissa", "George", "Deborah", "Timothy", "Laura",
+    "Mohammed", "Aisha", "Wei", "Mei", "Carlos", "Sofia", "Luis", "Ana", "Olga", "Ivan",
+    "Priya", "Arjun", "Yuki", "Kenji", "Fatima", "Omar", "Chloe", "Liam", "Noah", "Emma",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+    "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White",
+    "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen",
+    "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green", "Adams",
+    "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell", "Carter", "Roberts",
+    "Khan", "Patel", "Singh", "Kim", "Chen", "Wang", "Ivanova", "Novak", "Tanaka", "Sato",
+)
+EMAIL_DOMAINS = (("gmail.com", 45), ("yahoo.com", 15), ("outlook.com", 15), ("hotmail.com", 10),
+                 ("icloud.com", 8), ("example.org", 7))
+# Plan mix: mostly monthly, some quarterly and annual
+PLANS = (("Monthly", 30, 60), ("Quarterly", 90, 25), ("Annual", 365, 15))
+
+# Terms for search_members: common surname, first name prefix, email
+# fragment, phone prefix and a term that matches nothing
+SEARCH_TERMS = ("smith", "jen", "gmail", "555", "zzqx")
+
+def generate_members(count, seed=0, today=None):
+    """Yield `count` insert records (name, phone, email, start, end, type).
+
+    Names, e-mail domains and plans follow skewed distributions and start
+    dates are spread over the last two years, so the set mixes active,
+    expiring and long expired members the way a real gym's does. The same
+    seed always gives the same members.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    first_weights = [1 / (rank + 1) for rank in range(len(FIRST_NAMES))]
+    last_weights = [1 / (rank + 1) for rank in range(len(LAST_NAMES))]
+    domains, domain_weights = zip(*EMAIL_DOMAINS)
+    plans = [(name, duration) for name, duration, _ in PLANS]
+    plan_weights = [weight for _, _, weight in PLANS]
+
+    for number in range(count):
+        first = rng.choices(FIRST_NAMES, first_weights)[0]
+        last = rng.choices(LAST_NAMES, last_weights)[0]
+        name = f"{first} {last}"
+        phone = f"555{rng.randrange(10 ** 7):07d}" if rng.random() < 0.9 else None
+        email = None
+        if rng.random() < 0.85:
+            email = f"{first.lower()}.{last.lower()}{number}@{rng.choices(domains, domain_weights)[0]}"
+
+        plan, duration = rng.choices(plans, plan_weights)[0]
+        start = today - timedelta(days=rng.randrange(730))
+        # Some members renewed (several periods), a few got extension days
+        end = start + timedelta(days=duration * rng.choice((1, 1, 1, 2, 3)) + rng.choice((0, 0, 0, 7, 14)))
+        yield (name, phone, email, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), plan)
+
+def build_database(path, count, seed=0):
+    """Create a database at `path` holding `count` generated members"""
+    db = Database(path)
+    try:
+        records = generate_members(count, seed)
+        while True:
+            batch = [record for _, record in zip(range(INSERT_BATCH), records)]
+            if not batch:
+                break
+            success, result = db.insert_members(batch)
+            if not success:
+                raise RuntimeError(f"Could not insert benchmark members: {result}")
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        db.close()
+
+def summarize(times):
+    """Timing statistics in milliseconds for a list of durations in seconds"""
+    times = sorted(times)
+    return {
+        "runs": len(times),
+        "min_ms": round(times[0] * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "mean_ms": round(statistics.fmean(times) * 1000, 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 3),
+        "max_ms": round(times[-1] * 1000, 3),
+    }
+
+def measure(fn, repeat=REPEAT, setup=None):
+    """Run fn `repeat` times (after a warm-up run) and return its timing stats"""
+    if setup:
+        setup()
+    fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+def throughput(fn, operations):
+    """Call fn(i) for i in range(operations) and return timing plus ops/s"""
+    times = []
+    for i in range(operations):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    result = summarize(times)
+    result["ops_per_sec"] = round(operations / sum(times), 1)
+    return result
+
+def load_members_view(db, filter, sort):
+    """What FitGymApp._show_members does for a view: the count, the first
+    page and the page after it (keyset from the last row)"""
+    db.count_members(filter, None)
+    page = db.query_members(filter, None, sort, PAGE_SIZE)
+    if len(page) == PAGE_SIZE:
+        db.query_members(filter, None, sort, PAGE_SIZE, after=page[-1])
+
+def run_benchmarks(db, count, repeat=REPEAT, seed=0):
+    """Time the member workloads on `db` and return a list of result dicts.
+
+    Read caches are cleared before every timed run, so figures are for a
+    first Refresh or search rather than a repeated one. Writes run last
+    since they change the data.
+    """
+    rng = random.Random(seed)
+    results = []
+
+    def record(name, stats, **params):
+        results.append({"benchmark": name, "size": count, "params": params, **stats})
+
+    cold = db.invalidate_cache
+
+    record("get_all_members", measure(db.get_all_members, max(1, repeat if count <= 100000 else 1), cold))
+
+    for term in SEARCH_TERMS:
+        record("search_members", measure(lambda: db.search_members(term), repeat, cold), term=term)
+
+    ids = [rng.randint(1, count) for _ in range(1000)]
+    record("get_member", throughput(lambda i: (cold(), db.get_member(ids[i])), len(ids)), cache="cold")
+    record("get_member", throughput(lambda i: db.get_member(ids[i]), len(ids)), cache="warm")
+
+    for filter in [None] + sorted(DAYS_FILTERS):
+        for sort in MEMBER_SORTS:
+            record("load_members", measure(lambda: load_members_view(db, filter, sort), repeat, cold),
+                   filter=filter, sort=sort)
+
+    plans = [name for name, _, _ in PLANS]
+    new_members = list(generate_members(WRITE_OPERATIONS, seed + 1))
+    record("add_member", throughput(
+        lambda i: db.add_member(new_members[i][0], new_members[i][1], new_members[i][2], new_members[i][5]),
+        WRITE_OPERATIONS
+    ))
+
+    def update(i):
+        member = db.get_member(ids[i])
+        db.update_member(member.id, member.name, member.phone, member.email, plans[i % len(plans)])
+    record("update_member", throughput(update, WRITE_OPERATIONS))
+
+    return results
+
+def environment():
+    """Where the numbers were taken, for comparing result files"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+def benchmark(sizes=DEFAULT_SIZES, repeat=REPEAT, seed=0, data_dir=None, progress=print):
+    """Build (or reuse) a database per size, run the benchmarks and return the report.
+
+    Generated databases are kept in `data_dir` when given, so later runs skip
+    the generation; the benchmarks always run on a copy.
+    """
+    work_dir = tempfile.mkdtemp(prefix="fitgym-bench-")
+    results = []
+    try:
+        for count in sizes:
+            base = os.path.join(data_dir or work_dir, f"members-{count}-{seed}.db")
+            if not os.path.exists(base):
+                progress(f"Generating {count} members...")
+                start = time.perf_counter()
+                build_database(base, count, seed)
+                results.append({"benchmark": "generate", "size": count, "params": {},
+                                 "runs": 1, "total_ms": round((time.perf_counter() - start) * 1000, 3)})
+
+            work = os.path.join(work_dir, f"work-{count}.db")
+            shutil.copyfile(base, work)
+            progress(f"Benchmarking {count} members...")
+            db = Database(work)
+            try:
+                results.extend(run_benchmarks(db, count, repeat, seed))
+            finally:
+                db.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"environment": environment(), "seed": seed, "repeat": repeat, "results": results}
+
+def _result_key(result):
+    return (result["benchmark"], result["size"], json.dumps(result["params"], sort_keys=True))
+
+def compare(baseline, report, threshold=0.2):
+    """Return (result, baseline result, ratio) for medians that grew by more than `threshold`"""
+    previous = {_result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get(_result_key(result))
+        if not before or "median_ms" not in result or not before.get("median_ms"):
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append((result, before, ratio))
+    return regressions
+
+def format_result(result):
+    params = " ".join(f"{key}={value}" for key, value in result["params"].items())
+    if "median_ms" not in result:
+        return f"{result['size']:>8} {result['benchmark']:<16} {params:<30} total {result['total_ms']:.1f} ms"
+    line = f"{result['size']:>8} {result['benchmark']:<16} {params:<30} median {result['median_ms']:.3f} ms"
+    if "ops_per_sec" in result:
+        line += f"  {result['ops_per_sec']:.0f} ops/s"
+    return line
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark member queries on generated databases")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated member counts, e.g. " + ",".join(map(str, SIZES)))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="keep generated databases here and reuse them")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="report medians slower than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+    report = benchmark([int(size) for size in args.sizes.split(",")], args.repeat, args.seed, args.data_dir)
+    for result in report["results"]:
+        print(format_result(result))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for result, before, ratio in regressions:
+            print(f"SLOWER x{ratio:.2f}: {format_result(result)} (was {before['median_ms']:.3f} ms)")
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+from datetime import date, timedelta
+
+from database import Database, expiry_cutoff_day, end_day_for_days
+
+# SQLite allows 10 attached databases by default; keep one to spare
+ATTACH_BATCH = 9
+
+# Figures of one database's member_stats; {branch} is the branch id column
+# or a constant and {signups} restricts signups_daily to that branch
+BRANCH_FIGURES_SQL = '''
+    SELECT {branch},
+           COALESCE(SUM(s.members), 0),
+           COALESCE(SUM(CASE WHEN s.end_day > :cutoff THEN s.members END), 0),
+           COALESCE(SUM(CASE WHEN s.end_day BETWEEN :first AND :week THEN s.members END), 0),
+           COALESCE(SUM(CASE WHEN s.end_day BETWEEN :first AND :month THEN s.members END), 0),
+           (SELECT COALESCE(SUM(d.members), 0) FROM {schema}.signups_daily d
+            WHERE d.day BETWEEN :week_start AND :today {signups})
+    FROM {schema}.member_stats s
+'''
+
+FIGURES = ("members", "active", "expiring_7", "expiring_30", "new_this_week")
+
+def branch_path(main_db_file, branch):
+    """Path of a branch's own database file; relative paths are taken from
+    the directory of the main database"""
+    return os.path.join(os.path.dirname(os.path.abspath(main_db_file)), branch["db_file"])
+
+def create_branch(db, name, db_file=None):
+    """Register a branch and, with db_file, create the database holding its members.
+
+    Returns (True, branch id) or (False, message) like the Database writes.
+    """
+    path = db_file and branch_path(db.db_file, {"db_file": db_file})
+    if path and os.path.exists(path):
+        return False, f"{db_file} already exists"
+
+    success, result = db.add_branch(name, db_file)
+    if success and path:
+        # Opening runs the migrations, so the file gets the full schema
+        branch_db = Database(path)
+        branch_db.set_meta("branch_id", str(result))
+        branch_db.set_meta("branch_name", name)
+        branch_db.close()
+    return success, result
+
+def open_branch(db, branch, **kwargs):
+    """Return (Database, branch_id filter) for working on one branch.
+
+    A branch with its own file gets a Database on that file and no filter
+    (the whole file is the branch); other branches share `db`.
+    """
+    if branch["db_file"]:
+        return Database(branch_path(db.db_file, branch), **kwargs), None
+    return db, branch["id"]
+
+def branch_report(db, today=None):
+    """Member figures per branch across the main database and every branch file.
+
+    Returns one dict per branch with id, name, db_file and FIGURES, or
+    "missing": True when a branch file cannot be found. Branch files are
+    ATTACHed to the main connection ATTACH_BATCH at a time and read with one
+    UNION ALL query per batch; all figures come from the trigger-maintained
+    summary tables, so no members table is scanned.
+    """
+    today = today or date.today()
+    params = {
+        "cutoff": expiry_cutoff_day(today),
+        "first": end_day_for_days(1, today),
+        "week": end_day_for_days(7, today),
+        "month": end_day_for_days(30, today),
+        "week_start": (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d"),
+        "today": today.strftime("%Y-%m-%d"),
+    }
+    branches = db.get_branches()
+    conn = db.conn
+    figures = {}
+
+    # Branches sharing the main database, in one grouped query
+    cursor = conn.execute(BRANCH_FIGURES_SQL.format(
+        branch="s.branch_id", schema="main", signups="AND d.branch_id = s.branch_id"
+    ) + " GROUP BY s.branch_id", params)
+    for row in cursor.fetchall():
+        figures[row[0]] = row[1:]
+
+    files = [branch for branch in branches if branch["db_file"] and os.path.exists(branch_path(db.db_file, branch))]
+    for start in range(0, len(files), ATTACH_BATCH):
+        attached = []
+        try:
+            for branch in files[start:start + ATTACH_BATCH]:
+                schema = f"branch_{int(branch['id'])}"
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (branch_path(db.db_file, branch),))
+                attached.append((branch, schema))
+            cursor = conn.execute(" UNION ALL ".join(
+                BRANCH_FIGURES_SQL.format(branch=int(branch["id"]), schema=schema, signups="")
+                for branch, schema in attached
+            ), params)
+            for row in cursor.fetchall():
+                figures[row[0]] = row[1:]
+        finally:
+            for _, schema in attached:
+                conn.execute(f"DETACH DATABASE {schema}")
+
+    report = []
+    for branch in branches:
+        entry = dict(branch)
+        if branch["db_file"] and not os.path.exists(branch_path(db.db_file, branch)):
+            entry["missing"] = True
+        else:
+            entry.update(zip(FIGURES, figures.get(branch["id"], (0,) * len(FIGURES))))
+            entry["expired"] = entry["members"] - entry["active"]
+        report.append(entry)
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage branches and report across them")
+    parser.add_argument("--db", default="fitgym.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list branches")
+    add = commands.add_parser("add", help="add a branch")
+    add.add_argument("name")
+    add.add_argument("--file", help="keep the branch's members in this database file")
+    commands.add_parser("report", help="member figures for every branch")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        if args.command == "list":
+            for branch in db.get_branches():
+                print(f"{branch['id']:>4}  {branch['name']:<24} {branch['db_file'] or '(shared)'}")
+        elif args.command == "add":
+            success, result = create_branch(db, args.name, args.file)
+            print(f"Added branch {args.name} with id {result}" if success else f"Error: {result}")
+        else:
+            print(f"{'Branch':<24} {'Members':>8} {'Active':>8} {'Expired':>8} {'7 days':>8} {'30 days':>8} {'New':>6}")
+            for entry in branch_report(db):
+                if entry.get("missing"):
+                    print(f"{entry['name']:<24} missing file {entry['db_file']}")
+                    continue
+                print(f"{entry['name']:<24} {entry['members']:>8} {entry['active']:>8} {entry['expired']:>8} "
+                      f"{entry['expiring_7']:>8} {entry['expiring_30']:>8} {entry['new_this_week']:>6}")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+    finally:
+        db.close()
@@ -1,97 +1,333 @@
 import sqlite3
 import os
-from datetime import datetime, timedelta
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+
+from db_connection import ConnectionPool
+from models import Member
+from migrations import migrate
+from profiling import profiled
+
+def expiry_cutoff(today=None):
+    """Return the latest end date (YYYY-MM-DD) that counts as expired.
+
+    A membership has 0 days remaining once fewer than a full day is left,
+    so anything ending today or tomorrow is already expired.
+    """
+    today = today or date.today()
+    return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+
+def expiry_cutoff_day(today=None):
+    """expiry_cutoff as a day number, for comparisons with end_day"""
+    today = today or date.today()
+    return today.toordinal() + 1
+
+def status_for_end_date(end_date, today=None):
+    """Return the status a member with the given end date should have"""
+    return 'expired' if end_date <= expiry_cutoff(today) else 'active'
+
+def end_day_for_days(days, today=None):
+    """Return the end day number of a member with `days` days remaining"""
+    today = today or date.today()
+    return today.toordinal() + days + 1
+
+# Named days-remaining buckets as (min, max) days, either bound optional
+DAYS_FILTERS = {
+    "expired": (None, 0),
+    "critical": (1, 3),
+    "week": (1, 7),
+    "month": (1, 30),
+}
+
+# Sort orders for query_members. Each is a tuple of segments read one after
+# another, every segment in the order of one of the member indexes so pages
+# can be fetched with keyset pagination instead of sorting the whole table.
+# A segment is (where clause, sort columns, key of a member, membership test).
+#
+# "expiry" is the member list's default: members with days left first
+# (soonest to expire at the top), then expired members alphabetically.
+MEMBER_SORTS = {
+    "expiry": (
+        ("end_day > :cutoff",
+         ("end_day", "name COLLATE NOCASE", "id"),
+         lambda m: (m.end_ordinal, m.name, m.id),
+         lambda m, cutoff: m.end_ordinal > cutoff),
+        ("end_day <= :cutoff",
+         ("name COLLATE NOCASE", "end_day", "id"),
+         lambda m: (m.name, m.end_ordinal, m.id),
+         lambda m, cutoff: m.end_ordinal <= cutoff),
+    ),
+    "name": (
+        ("1",
+         ("name COLLATE NOCASE", "end_day", "id"),
+         lambda m: (m.name, m.end_ordinal, m.id),
+         lambda m, cutoff: True),
+    ),
+    "end_date": (
+        ("1",
+         ("end_day", "name COLLATE NOCASE", "id"),
+         lambda m: (m.end_ordinal, m.name, m.id),
+         lambda m, cutoff: True),
+    ),
+}
+
+# COLLATE NOCASE only folds ASCII letters
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def member_sort_key(member, sort="expiry", cutoff=None):
+    """Return a Python sort key that orders members exactly like query_members"""
+    cutoff = cutoff or expiry_cutoff_day()
+    for index, (_, _, key, contains) in enumerate(MEMBER_SORTS[sort]):
+        if contains(member, cutoff):
+            return (index,) + tuple(
+                value.translate(_NOCASE) if isinstance(value, str) else value
+                for value in key(member)
+            )
+
+MEMBER_COLUMNS = "id, name, phone, email, start_date, end_date, membership_type, status, branch_id"
+
+# Columns in the order of Member's fields; start_day/end_day are the
+# generated day-number columns (see migrations._add_day_columns)
+MEMBER_SELECT = (
+    "id, name, phone, email, start_day AS start_ordinal, end_day AS end_ordinal, "
+    "membership_type, status, branch_id"
+)
+
+# Whole days left after :today (a day number), matching expiry_cutoff
+DAYS_REMAINING_SQL = "MAX(0, end_day - :today - 1)"
+
+# Columns iter_members can project, as SQL expressions
+EXPORT_COLUMNS = {
+    column: column for column in MEMBER_COLUMNS.split(", ") + ["created_at"]
+}
+EXPORT_COLUMNS["days_remaining"] = DAYS_REMAINING_SQL
+
+def _search_words(search_term):
+    """Yield (text, digits) for each searchable word of a search term.
+    
+    `digits` is the digits-only form for words that look like phone numbers,
+    otherwise None. Words with nothing the tokenizer would index are skipped.
+    """
+    for word in search_term.split():
+        # Keep only characters that are safe inside a quoted FTS5 phrase
+        text = re.sub(r'[^\w@.+\-()]', '', word)
+        if not _search_tokens(text):
+            continue
+        digits = re.sub(r'[^0-9]', '', text)
+        phone_like = digits and re.fullmatch(r'[0-9+\-() ]+', text)
+        yield text, digits if phone_like else None
+
+def _search_tokens(text):
+    """Split text into tokens the way FTS5's unicode61 tokenizer does"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r'[^\W_]+', text.casefold())
+
+def build_search_query(search_term):
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word must match as a prefix of some name, email or phone token;
+    words that look like phone numbers also match the digits-only phone.
+    Returns None when the term has nothing searchable in it.
+    """
+    clauses = []
+    for text, digits in _search_words(search_term):
+        clause = f'"{text}"*'
+        if digits:
+            clause = f'({clause} OR phone_digits : "{digits}"*)'
+        clauses.append(clause)
+    return " AND ".join(clauses) if clauses else None
+
+def member_matches_search(member, search_term):
+    """Check a member against a search term in Python.
+    
+    Mirrors build_search_query, so results of an earlier search can be
+    narrowed in memory when the user keeps typing.
+    """
+    words = list(_search_words(search_term))
+    if not words:
+        return False
+    
+    columns = [_search_tokens(member.name), _search_tokens(member.email), _search_tokens(member.phone)]
+    phone_digits = re.sub(r'[ \-()+]', '', member.phone or '')
+    for text, digits in words:
+        query = _search_tokens(text)
+        # A quoted phrase with a trailing * matches consecutive tokens, the last by prefix
+        matched = any(
+            tokens[i:i + len(query) - 1] == query[:-1] and tokens[i + len(query) - 1].startswith(query[-1])
+            for tokens in columns
+            for i in range(len(tokens) - len(query) + 1)
+        )
+        if not matched and not (digits and phone_digits.startswith(digits)):
+            return False
+    return True
+
+# Upper bounds for the read caches kept by each Database
+MEMBER_CACHE_SIZE = 2048
+QUERY_CACHE_SIZE = 64
+
+# Branch of existing members, and of members added without one to a
+# database that is not a branch file (see migrations._add_branches)
+DEFAULT_BRANCH_ID = 1
+
+# Member columns copied into change_log and replicated by sync.py; ids are
+# local to a database file and status follows from end_date
+SYNC_COLUMNS = "name, phone, email, start_date, end_date, membership_type, branch_id"
+
+# Days-left horizons shown as "expiring soon" on the dashboard
+EXPIRING_BUCKETS = (1, 3, 7, 30)
+
+# Buffered check-ins are committed once this many are queued or the oldest
+# has waited this long, whichever comes first
+CHECK_IN_BATCH_SIZE = 500
+CHECK_IN_FLUSH_SECONDS = 1.0
 
 class Database:
-    def __init__(self, db_file="fitgym.db"):
-        """Initialize database connection"""
+    def __init__(self, db_file="fitgym.db", profile=None, pool=None, profiler=None):
+        """Initialize database connection.
+        
+        Connections come from a ConnectionPool (one per thread) configured by
+        `profile`; pass `pool` to share one pool between several Database
+        objects in the same process. A profiling.Profiler given as `profiler`
+        times the public methods and traces their SQL.
+        """
         self.db_file = db_file
-        self.conn = None
+        self.pool = pool or ConnectionPool(db_file, profile)
+        self.profiler = profiler
+        if profiler is not None:
+            self.pool.on_connect.append(profiler.attach)
+        self._local = threading.local()
+        
+        # Read caches: members by id (LRU), list queries/counts (LRU), the
+        # rarely changing membership types and the end day of every active
+        # member (for check-ins). Our own writes invalidate them; commits
+        # through other connections are caught by _validate_cache.
+        self._cache_lock = threading.RLock()
+        self._member_cache = OrderedDict()
+        self._query_cache = OrderedDict()
+        self._membership_types = None
+        self._active_members = None
+        self._members_version = None
+        # Bumped by every invalidation; a read that missed the cache only
+        # stores its result if no invalidation happened since (see _cache_put)
+        self._cache_generation = 0
+        self._cache_day = date.today()
+        
+        # Check-ins waiting for a group commit
+        self._check_in_lock = threading.Lock()
+        self._check_ins = []
+        self._check_ins_since = None
+        # Started with the first buffered visit, stopped by close()
+        self._flush_thread = None
+        self._flush_stop = None
+        
         self.create_connection()
         self.create_tables()
+        self.has_search_index = self._table_exists("members_fts")
+        # A branch file records its branch (see branches.create_branch); new
+        # members written to it belong there unless told otherwise
+        branch_id = self.get_meta("branch_id")
+        self.is_branch_file = branch_id is not None
+        self.default_branch_id = int(branch_id) if self.is_branch_file else DEFAULT_BRANCH_ID
+    
+    @property
+    def conn(self):
+        """The calling thread's connection"""
+        return self.pool.connection()
     
     def create_connection(self):
         """Create a database connection to the SQLite database"""
         try:
-            self.conn = sqlite3.connect(self.db_file)
+            self.pool.connection()
             return True
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
             return False
     
     def create_tables(self):
-        """Create necessary tables if they don't exist"""
+        """Create or upgrade the schema by running any pending migrations"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Create members table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS members (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT,
-                    email TEXT,
-                    start_date TEXT NOT NULL,
-                    end_date TEXT NOT NULL,
-                    membership_type TEXT NOT NULL,
-                    status TEXT DEFAULT 'active',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create membership_types table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS membership_types (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    duration INTEGER NOT NULL,
-                    price REAL NOT NULL,
-                    description TEXT
-                )
-            ''')
-            
-            # Insert default membership types if table is empty
-            cursor.execute("SELECT COUNT(*) FROM membership_types")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO membership_types (name, duration, price, description)
-                    VALUES 
-                    ('Monthly', 30, 50.00, 'Standard monthly membership'),
-                    ('Quarterly', 90, 130.00, 'Three month membership'),
-                    ('Annual', 365, 450.00, 'Full year membership')
-                ''')
-            
-            self.conn.commit()
+            applied = migrate(self.conn)
+            if applied:
+                print(f"Database migrated to schema version {applied[-1]}")
+                # Reopen so this thread's connection (and the statements FTS5
+                # keeps prepared on it) plans with the migrated statistics
+                self.pool.close()
             return True
         except sqlite3.Error as e:
             print(f"Table creation error: {e}")
             return False
     
-    def add_member(self, name, phone, email, membership_type):
-        """Add a new member to the database"""
+    @profiled
+    def add_member(self, name, phone, email, membership_type, branch_id=None):
+        """Add a new member to the database (default: to default_branch_id)"""
+        if branch_id is None:
+            branch_id = self.default_branch_id
         try:
             cursor = self.conn.cursor()
             
-            # Get membership duration
-            cursor.execute("SELECT duration FROM membership_types WHERE name = ?", (membership_type,))
-            result = cursor.fetchone()
-            if not result:
+            # Get membership duration and price
+            plan = self._membership_type(membership_type)
+            if plan is None:
                 return False, "Invalid membership type"
             
-            duration = result[0]
             start_date = datetime.now().strftime("%Y-%m-%d")
-            end_date = (datetime.now() + timedelta(days=duration)).strftime("%Y-%m-%d")
+            end_date = (datetime.now() + timedelta(days=plan['duration'])).strftime("%Y-%m-%d")
             
             cursor.execute('''
-                INSERT INTO members (name, phone, email, start_date, end_date, membership_type)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (name, phone, email, start_date, end_date, membership_type))
+                INSERT INTO members (name, phone, email, start_date, end_date, membership_type, branch_id, uid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, phone, email, start_date, end_date, membership_type, branch_id, uuid.uuid4().hex))
+            member_id = cursor.lastrowid
             
+            self._record_period(cursor, member_id, "join", membership_type, start_date, end_date, plan['price'])
+            self._log_changes(cursor, "id = :id", {"id": member_id})
             self.conn.commit()
-            return True, cursor.lastrowid
+            self.invalidate_cache(member_id)
+            return True, member_id
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    @profiled
+    def insert_members(self, records, branch_id=None):
+        """Insert many members of one branch in one transaction.
+        
+        `records` are (name, phone, email, start_date, end_date, membership_type)
+        tuples that have already been validated. Status is derived from the end
+        date, and the branch defaults to default_branch_id. Nothing is inserted
+        if any row fails. Imported periods are logged as "import" without a
+        payment, since what was charged is not known.
+        """
+        if branch_id is None:
+            branch_id = self.default_branch_id
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany('''
+                INSERT INTO members (name, phone, email, start_date, end_date, membership_type, status, branch_id, uid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (record + (status_for_end_date(record[4]), branch_id, uuid.uuid4().hex) for record in records))
+            count = cursor.rowcount
+            # The transaction holds the write lock, so the newest `count` ids are ours
+            cursor.execute('''
+                INSERT INTO membership_periods (member_id, kind, membership_type, start_date, end_date)
+                SELECT id, 'import', membership_type, start_date, end_date FROM members
+                WHERE id > (SELECT MAX(id) FROM members) - ?
+            ''', (count,))
+            self._log_changes(cursor, "id > (SELECT MAX(id) FROM members) - :count", {"count": count})
+            self.conn.commit()
+            self.invalidate_cache()
+            return True, count
         except sqlite3.Error as e:
+            self.conn.rollback()
             return False, str(e)
     
+    @profiled
     def update_member(self, member_id, name, phone, email, membership_type=None, extend_days=0):
         """Update member information and optionally extend membership"""
         try:
@@ -108,37 +344,44 @@ class Database:
             
             # Update membership type and end date if specified
             if membership_type and membership_type != current_membership_type:
-                cursor.execute("SELECT duration FROM membership_types WHERE name = ?", (membership_type,))
-                duration_result = cursor.fetchone()
-                if not duration_result:
+                plan = self._membership_type(membership_type)
+                if plan is None:
                     return False, "Invalid membership type"
                 
                 # Reset end date based on new membership type
-                duration = duration_result[0]
-                new_end_date = (datetime.now() + timedelta(days=duration)).strftime("%Y-%m-%d")
+                new_end_date = (datetime.now() + timedelta(days=plan['duration'])).strftime("%Y-%m-%d")
+                self._record_period(cursor, member_id, "change", membership_type,
+                                    datetime.now().strftime("%Y-%m-%d"), new_end_date, plan['price'])
             else:
                 # Extend current end date if requested
                 new_end_date = (current_end_date + timedelta(days=extend_days)).strftime("%Y-%m-%d") if extend_days > 0 else result[0]
                 membership_type = current_membership_type
+                if extend_days > 0:
+                    self._record_extension(cursor, member_id, membership_type, result[0], new_end_date, extend_days)
             
             cursor.execute('''
                 UPDATE members 
-                SET name = ?, phone = ?, email = ?, end_date = ?, membership_type = ?
+                SET name = ?, phone = ?, email = ?, end_date = ?, membership_type = ?, status = ?
                 WHERE id = ?
-            ''', (name, phone, email, new_end_date, membership_type, member_id))
+            ''', (name, phone, email, new_end_date, membership_type,
+                  status_for_end_date(new_end_date), member_id))
+            self._log_changes(cursor, "id = :id", {"id": member_id})
             
             self.conn.commit()
+            self.invalidate_cache(member_id)
             return True, "Member updated successfully"
         except sqlite3.Error as e:
+            self.conn.rollback()
             return False, str(e)
     
+    @profiled
     def update_member_dates(self, member_id, name, phone, email, membership_type, start_date, end_date, extend_days=0):
         """Update member information including start and end dates"""
         try:
             cursor = self.conn.cursor()
             
             # Get current member data
-            cursor.execute("SELECT * FROM members WHERE id = ?", (member_id,))
+            cursor.execute("SELECT start_date, end_date, membership_type FROM members WHERE id = ?", (member_id,))
             result = cursor.fetchone()
             if not result:
                 return False, "Member not found"
@@ -152,116 +395,743 @@ class Database:
             else:
                 new_end_date = end_date
             
+            if membership_type != result[2]:
+                # A plan change is charged at the new plan's price, as in update_member
+                plan = self._membership_type(membership_type)
+                if plan is None:
+                    return False, "Invalid membership type"
+                self._record_period(cursor, member_id, "change", membership_type,
+                                    start_date, end_date, plan['price'])
+            elif (start_date, end_date) != result[:2]:
+                # Hand-edited dates are logged as an adjustment without a payment
+                self._record_period(cursor, member_id, "adjust", membership_type, start_date, end_date)
+            if extend_days > 0:
+                self._record_extension(cursor, member_id, membership_type, end_date, new_end_date, extend_days)
+            
             cursor.execute('''
                 UPDATE members 
-                SET name = ?, phone = ?, email = ?, start_date = ?, end_date = ?, membership_type = ?
+                SET name = ?, phone = ?, email = ?, start_date = ?, end_date = ?, membership_type = ?, status = ?
                 WHERE id = ?
-            ''', (name, phone, email, start_date, new_end_date, membership_type, member_id))
+            ''', (name, phone, email, start_date, new_end_date, membership_type,
+                  status_for_end_date(new_end_date), member_id))
+            self._log_changes(cursor, "id = :id", {"id": member_id})
             
             self.conn.commit()
+            self.invalidate_cache(member_id)
             return True, "Member updated successfully"
         except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    @profiled
+    def set_member_branch(self, member_id, branch_id):
+        """Move a member to another branch of this database"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("UPDATE members SET branch_id = ? WHERE id = ?", (branch_id, member_id))
+            self._log_changes(cursor, "id = :id", {"id": member_id})
+            self.conn.commit()
+            self.invalidate_cache(member_id)
+            
+            if cursor.rowcount == 0:
+                return False, "Member not found"
+            return True, "Member moved successfully"
+        except sqlite3.Error as e:
+            self.conn.rollback()
             return False, str(e)
     
+    @profiled
+    def get_branches(self):
+        """Get all branches as dicts with id, name and db_file (None when the
+        branch's members are in this database)"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT id, name, db_file FROM branches ORDER BY id")
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error getting branches: {e}")
+            return []
+    
+    def add_branch(self, name, db_file=None):
+        """Register a branch; give db_file to keep its members in a file of their own"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT INTO branches (name, db_file) VALUES (?, ?)", (name, db_file))
+            self.conn.commit()
+            return True, cursor.lastrowid
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            return False, f"A branch named {name} already exists"
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    @profiled
     def delete_member(self, member_id):
         """Delete a member from the database"""
         try:
             cursor = self.conn.cursor()
+            # Logged first: the entry needs the member's uid
+            self._log_changes(cursor, "id = :id", {"id": member_id}, op="delete")
             cursor.execute("DELETE FROM members WHERE id = ?", (member_id,))
+            deleted = cursor.rowcount
             self.conn.commit()
+            self.invalidate_cache(member_id)
             
-            if cursor.rowcount == 0:
+            if deleted == 0:
                 return False, "Member not found"
             return True, "Member deleted successfully"
         except sqlite3.Error as e:
+            self.conn.rollback()
             return False, str(e)
     
-    def get_all_members(self):
-        """Get all members from the database"""
+    def _log_changes(self, cursor, where, params, op="upsert"):
+        """Append the members matching `where` to change_log for sync.py.
+        
+        Runs in the caller's transaction so a write and its log entries
+        commit together. Each member gets the next seq of this database's
+        origin and the next Lamport clock (one past every clock seen, local
+        or synced). Call it after an insert or update, and before a delete.
+        """
+        origin = self.sync_origin(cursor)
+        cursor.execute("SELECT seq FROM sync_vector WHERE origin = ?", (origin,))
+        row = cursor.fetchone()
+        cursor.execute("SELECT COALESCE(MAX(clock), 0) FROM change_log")
+        clock = cursor.fetchone()[0]
+        values = SYNC_COLUMNS if op == "upsert" else ", ".join("NULL" for _ in SYNC_COLUMNS.split(", "))
+        cursor.execute(f'''
+            INSERT INTO change_log (origin, seq, clock, uid, op, {SYNC_COLUMNS})
+            SELECT :origin, :seq + ROW_NUMBER() OVER (ORDER BY id), :clock + ROW_NUMBER() OVER (ORDER BY id),
+                   uid, :op, {values}
+            FROM members WHERE {where}
+        ''', dict(params, origin=origin, seq=row[0] if row else 0, clock=clock, op=op))
+    
+    @profiled
+    def seed_change_log(self):
+        """Log every member that has no change_log entry yet (members from
+        before schema version 11), so the next sync sends them.
+        
+        Returns (True, members logged) or (False, message).
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("UPDATE members SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+            self._log_changes(cursor, "NOT EXISTS (SELECT 1 FROM change_log c WHERE c.uid = members.uid)", {})
+            count = cursor.rowcount
+            self.conn.commit()
+            return True, count
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    def sync_origin(self, cursor=None):
+        """This database's origin id in change_log"""
+        cursor = cursor or self.conn.cursor()
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'sync_origin'")
+        return cursor.fetchone()[0]
+    
+    def _record_period(self, cursor, member_id, kind, membership_type, start_date, end_date, amount=None):
+        """Log a membership period and, if money was taken, its payment"""
+        cursor.execute('''
+            INSERT INTO membership_periods (member_id, kind, membership_type, start_date, end_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (member_id, kind, membership_type, start_date, end_date))
+        if amount:
+            cursor.execute('''
+                INSERT INTO payments (member_id, period_id, membership_type, amount, paid_on)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (member_id, cursor.lastrowid, membership_type, amount, date.today().strftime("%Y-%m-%d")))
+    
+    def _record_extension(self, cursor, member_id, membership_type, old_end_date, new_end_date, extend_days):
+        """Log an extension, charged pro rata at the plan's price per day"""
+        plan = self._membership_type(membership_type)
+        amount = round(plan['price'] * extend_days / plan['duration'], 2) if plan else None
+        self._record_period(cursor, member_id, "extend", membership_type, old_end_date, new_end_date, amount)
+    
+    @profiled
+    def get_member_periods(self, member_id):
+        """Get the membership history of a member in the order it was recorded"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT p.id, p.kind, p.membership_type, p.start_date, p.end_date, p.created_at,
+                       pay.amount, pay.paid_on
+                FROM membership_periods AS p
+                LEFT JOIN payments AS pay ON pay.period_id = p.id
+                WHERE p.member_id = ?
+                ORDER BY p.id
+            ''', (member_id,))
+            
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error getting membership history: {e}")
+            return []
+    
+    @profiled
+    def get_revenue(self, start_date, end_date, by="day"):
+        """Revenue per plan from the rollups, for days or months in a date range.
+        
+        Returns a list of (day or month, membership_type, amount, payments).
+        Bounds are YYYY-MM-DD and inclusive; monthly totals cover every month
+        the range touches.
+        """
+        try:
+            if by == "day":
+                table, period, start, end = "revenue_daily", "day", start_date, end_date
+            elif by == "month":
+                table, period, start, end = "revenue_monthly", "month", start_date[:7], end_date[:7]
+            else:
+                raise ValueError(f"Unknown revenue period: {by}")
+            
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT {period}, membership_type, amount, payments
+                FROM {table}
+                WHERE {period} BETWEEN ? AND ? AND payments > 0
+                ORDER BY {period}, membership_type
+            ''', (start, end))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting revenue: {e}")
+            return []
+    
+    @profiled
+    def get_revenue_by_plan(self, month=None):
+        """Total revenue per plan for a month (YYYY-MM, default: this month)"""
+        month = month or date.today().strftime("%Y-%m")
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT membership_type, amount FROM revenue_monthly
+                WHERE month = ? AND payments > 0
+                ORDER BY amount DESC
+            ''', (month,))
+            return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"Error getting revenue: {e}")
+            return {}
+    
+    @profiled
+    def get_dashboard_stats(self, today=None, branch_id=None):
+        """Live member KPIs read from the trigger-maintained summary tables.
+        
+        Returns a dict with active and expired counts, "expiring" mapping N
+        to the members with 1..N days left for each of EXPIRING_BUCKETS,
+        members per plan, and sign-ups since Monday. `branch_id` limits the
+        figures to one branch.
+        """
+        today = today or date.today()
+        cutoff = expiry_cutoff_day(today)
+        branch = "1" if branch_id is None else "branch_id = :branch_id"
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT membership_type,
+                       SUM(CASE WHEN end_day > :cutoff THEN members ELSE 0 END),
+                       SUM(members)
+                FROM member_stats
+                WHERE {branch}
+                GROUP BY membership_type
+            ''', {"cutoff": cutoff, "branch_id": branch_id})
+            by_plan = {}
+            active = total = 0
+            for membership_type, plan_active, plan_total in cursor.fetchall():
+                if plan_total:
+                    by_plan[membership_type] = plan_total
+                active += plan_active
+                total += plan_total
+        
+            # Same bounds as the DAYS_FILTERS buckets
+            expiring = {}
+            for days in EXPIRING_BUCKETS:
+                cursor.execute(f'''
+                    SELECT COALESCE(SUM(members), 0) FROM member_stats
+                    WHERE end_day BETWEEN :first AND :last AND {branch}
+                ''', {"first": end_day_for_days(1, today), "last": end_day_for_days(days, today), "branch_id": branch_id})
+                expiring[days] = cursor.fetchone()[0]
+        
+            week_start = today - timedelta(days=today.weekday())
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(members), 0) FROM signups_daily
+                WHERE day BETWEEN :first AND :last AND {branch}
+            ''', {"first": week_start.strftime("%Y-%m-%d"), "last": today.strftime("%Y-%m-%d"), "branch_id": branch_id})
+        
+            return {
+                "active": active,
+                "expired": total - active,
+                "expiring": expiring,
+                "by_plan": by_plan,
+                "new_this_week": cursor.fetchone()[0],
+            }
+        except sqlite3.Error as e:
+            print(f"Error getting dashboard stats: {e}")
+            return None
+    
+    @profiled
+    def check_in(self, member_id, door=None, when=None):
+        """Record a visit if the member's membership is active.
+        
+        Membership is checked against an in-memory map of active members.
+        The visit is buffered and committed together with others once
+        CHECK_IN_BATCH_SIZE are waiting, or by a background thread within
+        CHECK_IN_FLUSH_SECONDS otherwise. A visit can therefore be lost if the
+        process dies in that window; callers that need it on disk at once can
+        call flush_check_ins.
+        """
+        when = when or datetime.now()
+        end_day = self._active_end_day(member_id)
+        if end_day is None:
+            return False, "Member not found"
+        if end_day <= expiry_cutoff_day(when.date()):
+            return False, "Membership expired"
+        
+        with self._check_in_lock:
+            if not self._check_ins:
+                self._check_ins_since = time.monotonic()
+            self._check_ins.append((member_id, when.strftime("%Y-%m-%d %H:%M:%S"), door))
+            due = (len(self._check_ins) >= CHECK_IN_BATCH_SIZE
+                   or time.monotonic() - self._check_ins_since >= CHECK_IN_FLUSH_SECONDS)
+            if self._flush_thread is None:
+                self._flush_stop = threading.Event()
+                self._flush_thread = threading.Thread(
+                    target=self._flush_check_ins_periodically, args=(self._flush_stop,),
+                    name="fitgym-check-ins", daemon=True
+                )
+                self._flush_thread.start()
+        if due:
+            self.flush_check_ins()
+        return True, "Checked in"
+    
+    def _flush_check_ins_periodically(self, stop):
+        """Flush the check-in buffer every CHECK_IN_FLUSH_SECONDS until `stop` is set"""
+        try:
+            while not stop.wait(CHECK_IN_FLUSH_SECONDS):
+                self.flush_check_ins()
+        finally:
+            # The pool opened a connection for this thread on its first flush
+            self.pool.close()
+    
+    def _stop_check_in_flusher(self):
+        with self._check_in_lock:
+            thread, self._flush_thread = self._flush_thread, None
+        if thread is not None:
+            self._flush_stop.set()
+            thread.join()
+    
+    @profiled
+    def flush_check_ins(self):
+        """Write buffered check-ins in one transaction"""
+        with self._check_in_lock:
+            check_ins, self._check_ins = self._check_ins, []
+        if not check_ins:
+            return True, 0
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                "INSERT INTO attendance (member_id, checked_in_at, door) VALUES (?, ?, ?)", check_ins
+            )
+            self.conn.commit()
+            return True, len(check_ins)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            # Keep them for the next flush rather than dropping visits
+            with self._check_in_lock:
+                self._check_ins = check_ins + self._check_ins
+            print(f"Error saving check-ins: {e}")
+            return False, str(e)
+    
+    def _active_end_day(self, member_id):
+        """End day of a member via the active-member map, or None if there is no such member"""
+        self._validate_cache()
+        with self._cache_lock:
+            if self._active_members is None:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT id, end_day FROM members WHERE end_day > ?", (expiry_cutoff_day(),))
+                self._active_members = dict(cursor.fetchall())
+            end_day = self._active_members.get(member_id)
+        if end_day is not None:
+            return end_day
+        
+        # Expired, unknown, or changed since the map was loaded
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT end_day FROM members WHERE id = ?", (member_id,))
+        result = cursor.fetchone()
+        if not result:
+            return None
+        with self._cache_lock:
+            if self._active_members is not None and result[0] > expiry_cutoff_day():
+                self._active_members[member_id] = result[0]
+        return result[0]
+    
+    @profiled
+    def visit_history(self, member_id, limit=50, before=None):
+        """Get a member's visits, newest first.
+        
+        Pass the checked_in_at of the last visit shown as `before` for the
+        next page.
+        """
+        self.flush_check_ins()
         try:
             cursor = self.conn.cursor()
             cursor.execute('''
-                SELECT id, name, phone, email, start_date, end_date, membership_type, status
+                SELECT checked_in_at, door FROM attendance
+                WHERE member_id = ? AND checked_in_at < ?
+                ORDER BY checked_in_at DESC
+                LIMIT ?
+            ''', (member_id, before or "9999", limit))
+            
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error getting visit history: {e}")
+            return []
+    
+    @profiled
+    def get_all_members(self):
+        """Get all members from the database"""
+        try:
+            cursor = self._member_cursor()
+            cursor.execute(f'''
+                SELECT {MEMBER_SELECT}
                 FROM members
                 ORDER BY name
             ''')
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting members: {e}")
+            return []
+    
+    def iter_members(self, columns=None, filter=None, search=None, status=None,
+                     membership_type=None, batch_size=1000, branch_id=None):
+        """Stream members in id order as lists of up to batch_size tuples.
+        
+        `columns` picks and orders the EXPORT_COLUMNS to return (default: all);
+        `filter`, `search` and `branch_id` work as in query_members, and
+        `status` and `membership_type` restrict to exact values. Rows are fetched from
+        an open cursor, so the table is never held in memory at once. Unlike
+        the other readers this raises sqlite3.Error, so a failed export is not
+        mistaken for a short one.
+        """
+        columns = list(columns or EXPORT_COLUMNS)
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown member columns: {', '.join(unknown)}")
+        
+        where, params = self._member_filter_clause(filter, search, branch_id)
+        if status is not None:
+            where += " AND status = :status"
+            params['status'] = status
+        if membership_type is not None:
+            where += " AND membership_type = :membership_type"
+            params['membership_type'] = membership_type
+        params['today'] = date.today().toordinal()
+        select = ", ".join(f"{EXPORT_COLUMNS[column]} AS {column}" for column in columns)
+        
+        # A cursor of its own: the caller may run other queries between batches
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {select} FROM members WHERE {where} ORDER BY id", params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+    
+    @profiled
+    def count_members(self, filter=None, search=None, branch_id=None):
+        """Count the members query_members would return for the same filter and search"""
+        cache_key = ("count", filter, search, branch_id)
+        count = self._cache_get(self._query_cache, cache_key)
+        if count is not None:
+            return count
+        generation = self._cache_generation
+        
+        try:
+            where, params = self._member_filter_clause(filter, search, branch_id)
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM members WHERE {where}", params)
+            count = cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error counting members: {e}")
+            return 0
+        
+        self._cache_put(self._query_cache, cache_key, count, QUERY_CACHE_SIZE, generation)
+        return count
+    
+    @profiled
+    def query_members(self, filter=None, search=None, sort="expiry", limit=100, offset=None, after=None, before=None,
+                      branch_id=None):
+        """Get one page of members, filtered and sorted in SQL.
+        
+        `filter` is a DAYS_FILTERS name or a (min, max) days-remaining tuple,
+        `search` is free text as for search_members, `sort` a MEMBER_SORTS
+        name and `branch_id` limits the page to one branch (None for all). Pass the last member of the previous page as `after` (or the
+        first member of the next page as `before`) to continue from it;
+        `offset` is meant for jumping to an arbitrary position.
+        """
+        anchor = after or before
+        cache_key = (
+            "query", filter, search, branch_id, sort, limit, offset, before is not None,
+            (anchor.id, anchor.name, anchor.end_ordinal) if anchor else None
+        )
+        members = self._cache_get(self._query_cache, cache_key)
+        if members is None:
+            generation = self._cache_generation
+            members = self._query_members(filter, search, sort, limit, offset, after, before, branch_id)
+            if members is None:
+                return []
+            self._cache_put(self._query_cache, cache_key, members, QUERY_CACHE_SIZE, generation)
+        # Callers may reorder or extend the list they get back
+        return list(members)
+    
+    def _query_members(self, filter, search, sort, limit, offset, after, before, branch_id=None):
+        """Uncached query_members; returns None on error"""
+        try:
+            segments = MEMBER_SORTS[sort]
+            filter_where, filter_params = self._member_filter_clause(filter, search, branch_id)
+            params = dict(filter_params, cutoff=expiry_cutoff_day())
             
-            columns = [col[0] for col in cursor.description]
-            members = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if offset is not None:
+                return self._members_page_at_offset(segments, limit, offset, filter_where, params)
+            
+            anchor = after or before
+            anchor_segment = 0
+            if anchor:
+                anchor_segment = next(
+                    index for index, segment in enumerate(segments) if segment[3](anchor, params["cutoff"])
+                )
+            descending = before is not None
+            order = range(anchor_segment, -1, -1) if descending else range(anchor_segment, len(segments))
             
-            # Calculate days remaining for each member
-            for member in members:
-                end_date = datetime.strptime(member['end_date'], "%Y-%m-%d")
-                days_remaining = (end_date - datetime.now()).days
-                member['days_remaining'] = max(0, days_remaining)
+            members = []
+            for index in order:
+                segment_where, columns, key, _ = segments[index]
+                where = [segment_where, filter_where]
+                segment_params = dict(params)
+                if anchor and index == anchor_segment:
+                    # Row-value comparison continues exactly where the anchor left off;
+                    # SQLite only seeks on the redundant bound for the leading column
+                    names = [f":k{i}" for i in range(len(columns))]
+                    where.append(f"{columns[0]} {'<=' if descending else '>='} :k0")
+                    where.append(f"({', '.join(columns)}) {'<' if descending else '>'} ({', '.join(names)})")
+                    segment_params.update({f"k{i}": value for i, value in enumerate(key(anchor))})
                 
-                # Update status if membership has expired
-                if days_remaining <= 0 and member['status'] == 'active':
-                    cursor.execute("UPDATE members SET status = 'expired' WHERE id = ?", (member['id'],))
-                    member['status'] = 'expired'
+                direction = " DESC" if descending else ""
+                rows = self._select_members(
+                    " AND ".join(where),
+                    segment_params,
+                    ", ".join(column + direction for column in columns),
+                    limit - len(members)
+                )
+                members = rows[::-1] + members if descending else members + rows
+                if len(members) >= limit:
+                    break
             
-            self.conn.commit()
             return members
+        except (sqlite3.Error, KeyError) as e:
+            print(f"Error querying members: {e}")
+            return None
+    
+    @profiled
+    def get_member_if_matches(self, member_id, filter=None, search=None, branch_id=None):
+        """Get a member as query_members would return it, or None if it is not in that view"""
+        try:
+            where, params = self._member_filter_clause(filter, search, branch_id)
+            params["member_id"] = member_id
+            members = self._select_members(f"id = :member_id AND {where}", params, "id", 1)
+            return members[0] if members else None
         except sqlite3.Error as e:
-            print(f"Error getting members: {e}")
-            return []
+            print(f"Error getting member: {e}")
+            return None
+    
+    def _members_page_at_offset(self, segments, limit, offset, filter_where, params):
+        """Fetch a page by position, skipping whole segments by count"""
+        cursor = self.conn.cursor()
+        members = []
+        for segment_where, columns, key, _ in segments:
+            where = f"{segment_where} AND {filter_where}"
+            if len(segments) > 1:
+                cursor.execute(f"SELECT COUNT(*) FROM members WHERE {where}", params)
+                segment_size = cursor.fetchone()[0]
+                if offset >= segment_size:
+                    offset -= segment_size
+                    continue
+            
+            members += self._select_members(where, params, ", ".join(columns), limit - len(members), offset)
+            offset = 0
+            if len(members) >= limit:
+                break
+        return members
+    
+    def _member_filter_clause(self, filter, search, branch_id=None):
+        """Translate a days filter, search text and branch into a WHERE clause"""
+        where = ["1"]
+        params = {}
+        
+        if branch_id is not None:
+            where.append("branch_id = :branch_id")
+            params["branch_id"] = branch_id
+        
+        if isinstance(filter, str):
+            filter = DAYS_FILTERS[filter]
+        min_days, max_days = filter or (None, None)
+        if min_days:
+            where.append("end_day >= :min_end")
+            params["min_end"] = end_day_for_days(min_days)
+        if max_days is not None:
+            where.append("end_day <= :max_end")
+            params["max_end"] = end_day_for_days(max_days)
+        
+        if search is not None:
+            if not self.has_search_index:
+                where.append("(name LIKE :pattern OR phone LIKE :pattern OR email LIKE :pattern)")
+                params["pattern"] = f"%{search}%"
+            else:
+                match = build_search_query(search)
+                if match is None:
+                    where.append("0")
+                else:
+                    where.append("id IN (SELECT rowid FROM members_fts WHERE members_fts MATCH :match)")
+                    params["match"] = match
+        
+        return " AND ".join(where), params
+    
+    def _select_members(self, where, params, order_by, limit, offset=0):
+        """Run a member SELECT returning Member records"""
+        cursor = self._member_cursor()
+        cursor.execute(f'''
+            SELECT {MEMBER_SELECT}
+            FROM members
+            WHERE {where}
+            ORDER BY {order_by}
+            LIMIT :limit OFFSET :offset
+        ''', dict(params, limit=limit, offset=offset))
+        return cursor.fetchall()
+    
+    def _member_cursor(self):
+        """A cursor that builds a Member from each row of a MEMBER_SELECT"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = Member.row_factory
+        return cursor
     
+    @profiled
     def get_member(self, member_id):
         """Get a specific member by ID"""
+        member = self._cache_get(self._member_cache, member_id)
+        if member is not None:
+            return member
+        generation = self._cache_generation
+        
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, name, phone, email, start_date, end_date, membership_type, status
+            cursor = self._member_cursor()
+            cursor.execute(f'''
+                SELECT {MEMBER_SELECT}
                 FROM members
                 WHERE id = ?
             ''', (member_id,))
             
-            result = cursor.fetchone()
-            if not result:
+            member = cursor.fetchone()
+            if not member:
                 return None
             
-            columns = [col[0] for col in cursor.description]
-            member = dict(zip(columns, result))
-            
-            # Calculate days remaining
-            end_date = datetime.strptime(member['end_date'], "%Y-%m-%d")
-            days_remaining = (end_date - datetime.now()).days
-            member['days_remaining'] = max(0, days_remaining)
-            
+            self._cache_put(self._member_cache, member_id, member, MEMBER_CACHE_SIZE, generation)
             return member
         except sqlite3.Error as e:
             print(f"Error getting member: {e}")
             return None
     
+    @profiled
     def search_members(self, search_term):
         """Search members by name, phone, or email"""
+        if not self.has_search_index:
+            return self._search_members_like(search_term)
+        
+        match = build_search_query(search_term)
+        if match is None:
+            return []
+        
         try:
-            cursor = self.conn.cursor()
+            cursor = self._member_cursor()
+            cursor.execute(f'''
+                SELECT {MEMBER_SELECT}
+                FROM members
+                WHERE id IN (SELECT rowid FROM members_fts WHERE members_fts MATCH ?)
+                ORDER BY name
+            ''', (match,))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching members: {e}")
+            return []
+    
+    @profiled
+    def search_top(self, search_term, limit=10):
+        """Return the best `limit` matches for a search, most relevant first"""
+        if not self.has_search_index:
+            return self._search_members_like(search_term)[:limit]
+        
+        match = build_search_query(search_term)
+        if match is None:
+            return []
+        
+        try:
+            cursor = self._member_cursor()
+            # Name hits outrank email hits, which outrank phone hits
+            cursor.execute(f'''
+                SELECT {MEMBER_SELECT}
+                FROM (
+                    SELECT rowid, bm25(members_fts, 10.0, 3.0, 1.0, 1.0) AS score
+                    FROM members_fts
+                    WHERE members_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                ) AS hits
+                JOIN members AS m ON m.id = hits.rowid
+                ORDER BY hits.score, name
+            ''', (match, limit))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching members: {e}")
+            return []
+    
+    def _search_members_like(self, search_term):
+        """Substring search used when SQLite lacks FTS5"""
+        try:
+            cursor = self._member_cursor()
             search_pattern = f"%{search_term}%"
             
-            cursor.execute('''
-                SELECT id, name, phone, email, start_date, end_date, membership_type, status
+            cursor.execute(f'''
+                SELECT {MEMBER_SELECT}
                 FROM members
                 WHERE name LIKE ? OR phone LIKE ? OR email LIKE ?
                 ORDER BY name
             ''', (search_pattern, search_pattern, search_pattern))
-            
-            columns = [col[0] for col in cursor.description]
-            members = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            
-            # Calculate days remaining for each member
-            for member in members:
-                end_date = datetime.strptime(member['end_date'], "%Y-%m-%d")
-                days_remaining = (end_date - datetime.now()).days
-                member['days_remaining'] = max(0, days_remaining)
-            
-            return members
+            return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error searching members: {e}")
             return []
     
+    def _table_exists(self, name):
+        """Check whether a table (or virtual table) exists in the schema"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+            return cursor.fetchone() is not None
+        except sqlite3.Error:
+            return False
+    
+    @profiled
     def get_membership_types(self):
         """Get all membership types"""
+        self._validate_cache()
+        if self._membership_types is not None:
+            return [dict(t) for t in self._membership_types]
+        generation = self._cache_generation
+        
         try:
             cursor = self.conn.cursor()
             cursor.execute("SELECT id, name, duration, price, description FROM membership_types")
@@ -269,12 +1139,236 @@ class Database:
             columns = [col[0] for col in cursor.description]
             types = [dict(zip(columns, row)) for row in cursor.fetchall()]
             
-            return types
+            with self._cache_lock:
+                if generation == self._cache_generation:
+                    self._membership_types = types
+            return [dict(t) for t in types]
         except sqlite3.Error as e:
             print(f"Error getting membership types: {e}")
             return []
     
+    def _membership_type(self, membership_type):
+        """Return a membership type by name, or None if unknown"""
+        for t in self.get_membership_types():
+            if t['name'] == membership_type:
+                return t
+        return None
+    
+    def invalidate_cache(self, member_id=None):
+        """Forget cached reads after a write; pass member_id to keep other members"""
+        with self._cache_lock:
+            self._cache_generation += 1
+            if member_id is None:
+                self._member_cache.clear()
+                self._active_members = None
+            else:
+                self._member_cache.pop(member_id, None)
+                if self._active_members is not None:
+                    # Looked up again on the member's next check-in
+                    self._active_members.pop(member_id, None)
+            self._query_cache.clear()
+    
+    def _validate_cache(self):
+        """Drop everything cached if member data changed elsewhere or the day changed.
+        
+        PRAGMA data_version (per connection, so tracked per thread) is free to
+        read and tells whether any other connection committed. Only then is
+        the members change counter read, so check-ins and other writes that
+        leave members alone do not flush the caches.
+        """
+        data_version = self._read_data_version()
+        with self._cache_lock:
+            today = date.today()
+            seen = getattr(self._local, "data_version", None)
+            if seen is not None and data_version == seen and self._cache_day == today:
+                return
+            self._local.data_version = data_version
+            
+            members_version = self._read_members_version()
+            if members_version is not None and members_version == self._members_version and self._cache_day == today:
+                return
+            self.invalidate_cache()
+            self._membership_types = None
+            self._members_version = members_version
+            self._cache_day = today
+    
+    def _read_data_version(self):
+        try:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+    
+    def members_version(self):
+        """Counter bumped by every change to members or membership types.
+        
+        Cheap to read, so callers can tell whether member data they hold
+        (e.g. an HTTP ETag) is still current.
+        """
+        return self._read_members_version()
+    
+    def _read_members_version(self):
+        try:
+            result = self.conn.execute("SELECT version FROM change_counters WHERE name = 'members'").fetchone()
+            return result[0] if result else None
+        except sqlite3.Error:
+            return None
+    
+    def _cache_get(self, cache, key):
+        self._validate_cache()
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache, key, value, max_size, generation):
+        """Store a read taken at cache `generation`, unless a write has
+        invalidated the cache since (the value may predate that write)"""
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            cache[key] = value
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+    
+    @profiled
+    def expire_members(self, today=None):
+        """Mark every lapsed active membership as expired in one statement.
+        
+        Returns the number of members expired, or None if the sweep failed.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                UPDATE members SET status = 'expired'
+                WHERE status = 'active' AND end_day <= ?
+            ''', (expiry_cutoff_day(today),))
+            self.conn.commit()
+            if cursor.rowcount:
+                self.invalidate_cache()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Error expiring members: {e}")
+            return None
+    
+    @profiled
+    def due_reminders(self, thresholds, today=None, catch_up_days=0, branch_id=None):
+        """Members who have entered a days-left window without being reminded.
+        
+        `thresholds` are days-left values (e.g. 7, 3, 1, 0); each member is
+        placed in the tightest window it has reached and is returned unless
+        sent_reminders already holds that window or a tighter one for the
+        same end date. Members who expired up to `catch_up_days` ago are
+        still included. One range scan over end_day, so only the members
+        near their end date are read. Returns dicts with the member's id,
+        name, contact details, plan, end_date, end_day, branch_id and threshold.
+        """
+        today = today or date.today()
+        thresholds = sorted(thresholds)
+        # days left = end_day - today - 1 (see DAYS_REMAINING_SQL)
+        threshold = "CASE " + " ".join(
+            f"WHEN members.end_day <= :today + {int(days) + 1} THEN {int(days)}" for days in thresholds
+        ) + " END"
+        branch = "" if branch_id is None else "AND branch_id = :branch_id"
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT id, name, email, phone, membership_type, end_date, end_day, branch_id,
+                       {threshold} AS threshold
+                FROM members
+                WHERE end_day BETWEEN :first AND :last {branch}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM sent_reminders s
+                      WHERE s.member_id = members.id AND s.end_day = members.end_day
+                        AND s.threshold <= {threshold}
+                  )
+                ORDER BY end_day, id
+            ''', {
+                "today": today.toordinal(),
+                "first": end_day_for_days(0, today) - catch_up_days,
+                "last": end_day_for_days(thresholds[-1], today),
+                "branch_id": branch_id,
+            })
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error finding due reminders: {e}")
+            return []
+    
+    @profiled
+    def record_reminders(self, reminders, keep_days=None, today=None):
+        """Claim (member_id, end_day, threshold) reminders before sending them.
+        
+        Returns (True, the reminders this call recorded); ones already in
+        sent_reminders, e.g. claimed by another terminal, are left out and
+        must not be sent. With `keep_days`, records for memberships that
+        ended more than that many days ago are dropped as well, since they
+        can no longer be due.
+        """
+        try:
+            cursor = self.conn.cursor()
+            recorded = []
+            for reminder in reminders:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO sent_reminders (member_id, end_day, threshold) VALUES (?, ?, ?)
+                ''', reminder)
+                if cursor.rowcount:
+                    recorded.append(reminder)
+            if keep_days is not None:
+                today = today or date.today()
+                cursor.execute("DELETE FROM sent_reminders WHERE end_day < ?", (today.toordinal() - keep_days,))
+            self.conn.commit()
+            return True, recorded
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    @profiled
+    def forget_reminders(self, reminders):
+        """Drop the records of reminders that could not be sent, so they are due again"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                "DELETE FROM sent_reminders WHERE member_id = ? AND end_day = ? AND threshold = ?", reminders
+            )
+            self.conn.commit()
+            return True, len(reminders)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+    
+    def get_meta(self, key, default=None):
+        """Get a bookkeeping value from the app_meta table"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT value FROM app_meta WHERE key = ?", (key,))
+            result = cursor.fetchone()
+            return result[0] if result else default
+        except sqlite3.Error as e:
+            print(f"Error reading meta {key}: {e}")
+            return default
+    
+    def set_meta(self, key, value):
+        """Store a bookkeeping value in the app_meta table"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT INTO app_meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (key, value))
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error writing meta {key}: {e}")
+            return False
+    
+    def interrupt(self, thread_id=None):
+        """Abort the statement running on a thread's connection (default: the caller's)"""
+        self.pool.interrupt(thread_id)
+    
     def close(self):
-        """Close the database connection"""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Close the calling thread's database connection"""
+        self._stop_check_in_flusher()
+        self.flush_check_ins()
+        self.pool.close()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+class ConnectionProfile:
+    """PRAGMA settings applied to every connection opened on the database file.
+
+    The defaults suit several front-desk terminals and background jobs sharing
+    one file: WAL lets readers and a writer work at the same time, and
+    busy_timeout makes a writer wait for the lock instead of failing with
+    "database is locked".
+    """
+    def __init__(self, journal_mode="WAL", synchronous="NORMAL", busy_timeout_ms=5000,
+                 mmap_size=64 * 1024 * 1024, cache_size_kb=16 * 1024, temp_store="MEMORY"):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.temp_store = temp_store
+
+    def connect(self, db_file):
+        """Open a connection to db_file and apply this profile to it"""
+        conn = sqlite3.connect(db_file, timeout=self.busy_timeout_ms / 1000)
+        self.apply(conn)
+        return conn
+
+    def apply(self, conn):
+        """Apply the PRAGMAs to an open connection"""
+        # PRAGMA does not accept bound parameters; values come from code, not users
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        if self.mmap_size is not None:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if self.cache_size_kb is not None:
+            # Negative cache_size is a size in KiB rather than a page count
+            conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        if self.temp_store:
+            conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+# Plain sqlite3 defaults: rollback journal, no busy wait
+LEGACY_PROFILE = ConnectionProfile(
+    journal_mode=None, synchronous=None, busy_timeout_ms=0,
+    mmap_size=None, cache_size_kb=None, temp_store=None
+)
+
+DEFAULT_PROFILE = ConnectionProfile()
+
+class ConnectionPool:
+    """Hands each thread its own connection to one database file.
+
+    sqlite3 connections may only be used by the thread that opened them, so
+    the pool opens one lazily per thread and keeps it for that thread's
+    lifetime. Other processes get their own pools; WAL and busy_timeout from
+    the profile keep them from tripping over each other. Functions in
+    `on_connect` are called with every new connection, on its thread.
+    """
+    def __init__(self, db_file, profile=None):
+        self.db_file = db_file
+        self.profile = profile or DEFAULT_PROFILE
+        self.on_connect = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def connection(self):
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.profile.connect(self.db_file)
+            for hook in self.on_connect:
+                hook(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections[threading.get_ident()] = conn
+        return conn
+
+    def interrupt(self, thread_id=None):
+        """Abort the statement running on a thread's connection (default: the caller's)"""
+        with self._lock:
+            conn = self._connections.get(thread_id or threading.get_ident())
+        if conn is not None:
+            # Connection.interrupt is the one call sqlite3 allows from any thread
+            conn.interrupt()
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._connections)
@@ -0,0 +1,152 @@
+import queue
+import threading
+
+class DbFuture:
+    """Handle for a call submitted to a DatabaseExecutor"""
+    def __init__(self, executor, fn, args, kwargs, on_done, on_error, interruptible):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.interruptible = interruptible
+        self._cancelled = False
+        self._done = False
+
+    def cancel(self):
+        """Drop the call if it has not run yet and suppress its callbacks.
+
+        An interruptible call that is already running is aborted inside SQLite.
+        """
+        if self._done:
+            return False
+        self._cancelled = True
+        self.executor._interrupt(self)
+        return True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def done(self):
+        return self._done
+
+class DatabaseExecutor:
+    """Runs Database calls on a dedicated worker thread.
+
+    SQLite connections belong to the thread that opened them, so the worker
+    creates its own Database with `db_factory` and every call goes through
+    `submit`. Results are handed back on the Tk thread by polling with
+    `root.after`, so callbacks may touch widgets freely.
+    """
+    def __init__(self, root, db_factory, on_busy=None, poll_interval_ms=15):
+        self.root = root
+        self.db_factory = db_factory
+        self.on_busy = on_busy
+        self.poll_interval_ms = poll_interval_ms
+
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = None
+        self._db = None
+        self._pending = 0
+        self._polling = False
+
+        self._thread = threading.Thread(target=self._run, name="fitgym-db", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, interruptible=False, **kwargs):
+        """Run `fn(db, *args, **kwargs)` on the worker thread.
+
+        `on_done(result)` or `on_error(exception)` is called on the Tk thread
+        unless the returned future is cancelled first. Mark read-only calls
+        `interruptible` so cancelling them can abort a running query.
+        """
+        future = DbFuture(self, fn, args, kwargs, on_done, on_error, interruptible)
+        self._pending += 1
+        if self._pending == 1 and self.on_busy:
+            self.on_busy(True)
+        self._tasks.put(future)
+        self._start_polling()
+        return future
+
+    def reopen(self, db_factory, on_done=None, on_error=None):
+        """Switch the worker to a new Database once the calls queued before it finish.
+
+        The old database is closed only after `db_factory` succeeds, so a
+        failed switch leaves the worker on the database it had.
+        """
+        def reopen(db):
+            new_db = db_factory()
+            with self._lock:
+                self._db = new_db
+            self.db_factory = db_factory
+            db.close()
+        return self.submit(reopen, on_done=on_done, on_error=on_error)
+
+    def shutdown(self, timeout=5):
+        """Finish queued calls, close the worker's database and stop the thread"""
+        self._tasks.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        self._db = self.db_factory()
+        while True:
+            future = self._tasks.get()
+            if future is None:
+                break
+
+            result = error = None
+            if not future._cancelled:
+                with self._lock:
+                    self._running = future
+                try:
+                    result = future.fn(self._db, *future.args, **future.kwargs)
+                except Exception as e:
+                    error = e
+                finally:
+                    with self._lock:
+                        self._running = None
+            self._results.put((future, result, error))
+
+        self._db.close()
+
+    def _interrupt(self, future):
+        with self._lock:
+            if self._running is future and future.interruptible:
+                # The worker's connection, not the one of the calling Tk thread
+                self._db.interrupt(self._thread.ident)
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self):
+        """Deliver finished calls to their callbacks on the Tk thread"""
+        while True:
+            try:
+                future, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            future._done = True
+            self._pending -= 1
+            if self._pending == 0 and self.on_busy:
+                self.on_busy(False)
+
+            if future._cancelled:
+                continue
+            if error is not None:
+                if future.on_error:
+                    future.on_error(error)
+                else:
+                    print(f"Database call {getattr(future.fn, '__name__', future.fn)} failed: {error}")
+            elif future.on_done:
+                future.on_done(result)
+
+        if self._pending > 0:
+            self.root.after(self.poll_interval_ms, self._poll)
+        else:
+            self._polling = False
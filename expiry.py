@@ -0,0 +1,42 @@
+from datetime import date
+
+class ExpiryEngine:
+    """Keeps member status in sync with end dates using a daily set-based sweep"""
+    LAST_RUN_KEY = "last_expiry_sweep"
+    # How often the app checks whether a sweep is due (see FitGymApp._schedule_expiry_sweep)
+    CHECK_INTERVAL_MS = 15 * 60 * 1000
+
+    def __init__(self, db):
+        self.db = db
+
+    def last_run(self):
+        """Return the date (YYYY-MM-DD) of the last completed sweep, if any"""
+        return self.db.get_meta(self.LAST_RUN_KEY)
+
+    def is_due(self, today=None):
+        """A sweep is due once per calendar day"""
+        today = today or date.today()
+        return self.last_run() != today.strftime("%Y-%m-%d")
+
+    def run(self, force=False, today=None):
+        """Run the sweep if due and return the number of members expired"""
+        today = today or date.today()
+        if not force and not self.is_due(today):
+            return 0
+
+        expired = self.db.expire_members(today)
+        if expired is None:
+            # Not recorded as today's sweep, so the next check retries it
+            return 0
+        self.db.set_meta(self.LAST_RUN_KEY, today.strftime("%Y-%m-%d"))
+        return expired
+
+if __name__ == "__main__":
+    # Allow the sweep to be run from cron / Task Scheduler
+    import sys
+    from database import Database
+
+    db = Database(sys.argv[1] if len(sys.argv) > 1 else "fitgym.db")
+    count = ExpiryEngine(db).run(force=True)
+    print(f"Expired {count} members")
+    db.close()
@@ -0,0 +1,163 @@
+import csv
+import gzip
+import importlib.util
+import json
+import os
+import tempfile
+
+from database import DAYS_FILTERS, EXPORT_COLUMNS
+
+BATCH_SIZE = 5000
+
+def write_csv(path, columns, batches):
+    """CSV with a header line"""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in batches:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+def write_jsonl(path, columns, batches):
+    """One JSON object per member"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in batches:
+            f.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            count += len(rows)
+    return count
+
+def write_columnar(path, columns, batches):
+    """Gzipped JSON lines, one per batch, each holding the batch column by column.
+
+    The first line is {"columns": [...]}; every following line is a row group
+    {"rows": n, "data": [[column 0 values], [column 1 values], ...]}. Column
+    runs compress far better than rows and can be loaded one group at a time.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"columns": columns}) + "\n")
+        for rows in batches:
+            data = [list(values) for values in zip(*rows)]
+            f.write(json.dumps({"rows": len(rows), "data": data}) + "\n")
+            count += len(rows)
+    return count
+
+def write_parquet(path, columns, batches):
+    """Parquet via pyarrow, one row group per batch"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use 'columnar' instead")
+
+    count = 0
+    writer = None
+    try:
+        for rows in batches:
+            table = pa.table({column: list(values) for column, values in zip(columns, zip(*rows))})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # No members: still leave a valid (empty) file
+        pq.write_table(pa.table({column: [] for column in columns}), path)
+    return count
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "columnar": write_columnar,
+    "parquet": write_parquet,
+}
+
+# Optional packages a format needs, checked before anything is written
+FORMAT_REQUIRES = {
+    "parquet": "pyarrow",
+}
+
+def _target_mode(path):
+    """Permissions of the file being replaced, or the umask default for a new one"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def export_members(db, path, format="csv", columns=None, batch_size=BATCH_SIZE, **filters):
+    """Stream members to a file and return the number of rows written.
+
+    `columns` is a projection over EXPORT_COLUMNS (default: all of them);
+    `filters` are passed to Database.iter_members (filter, search, status,
+    membership_type, branch_id). The file is written under a temporary name
+    and renamed into place when complete, so a failed export never replaces
+    or truncates an existing file. Raises ValueError for an unknown format
+    or column and RuntimeError when the format needs a missing package.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported export format: {format}")
+    required = FORMAT_REQUIRES.get(format)
+    if required and importlib.util.find_spec(required) is None:
+        raise RuntimeError(f"{format} export needs {required} (pip install {required})")
+    columns = list(columns or EXPORT_COLUMNS)
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown member columns: {', '.join(unknown)}")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".export-", suffix=".tmp")
+    os.close(fd)
+    try:
+        batches = db.iter_members(columns, batch_size=batch_size, **filters)
+        count = WRITERS[format](temp_path, columns, batches)
+        # mkstemp creates the file owner-only; give it the mode the export
+        # would have had if written in place
+        os.chmod(temp_path, _target_mode(path))
+        os.replace(temp_path, path)
+        return count
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+if __name__ == "__main__":
+    import argparse
+    import sqlite3
+    import sys
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Export members to CSV, JSONL or a columnar file")
+    parser.add_argument("file")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--columns", help="comma separated, from: " + ", ".join(EXPORT_COLUMNS))
+    parser.add_argument("--filter", choices=sorted(DAYS_FILTERS))
+    parser.add_argument("--search")
+    parser.add_argument("--status", choices=["active", "expired"])
+    parser.add_argument("--membership-type")
+    parser.add_argument("--branch", type=int, help="branch id")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        count = export_members(
+            db, args.file, args.format,
+            columns=args.columns.split(",") if args.columns else None,
+            batch_size=args.batch_size,
+            filter=args.filter, search=args.search,
+            status=args.status, membership_type=args.membership_type,
+            branch_id=args.branch
+        )
+        print(f"Exported {count} members to {args.file}")
+    except (sqlite3.Error, ValueError, RuntimeError, OSError) as e:
+        print(f"Export failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
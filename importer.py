@@ -0,0 +1,161 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from validation import validate_member
+
+BATCH_SIZE = 1000
+
+class ImportResult:
+    """Outcome of an import: rows inserted and per-row errors"""
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []
+
+    def add_error(self, row_number, messages):
+        self.errors.append((row_number, messages))
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+def read_csv(path):
+    """Yield (row number, row dict) from a CSV file with a header line"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        # Row 1 is the header
+        for number, row in enumerate(csv.DictReader(f), start=2):
+            yield number, row
+
+def read_jsonl(path):
+    """Yield (line number, object) from a file with one JSON object per line"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = e
+            yield number, row
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+def read_rows(path, format=None):
+    """Pick a reader by `format` or by the file extension"""
+    format = format or path.rsplit(".", 1)[-1].lower()
+    if format == "json":
+        format = "jsonl"
+    if format not in READERS:
+        raise ValueError(f"Unsupported import format: {format}")
+    return READERS[format](path)
+
+def _field(row, name):
+    value = row.get(name)
+    return str(value).strip() if value is not None else ""
+
+def prepare_member(row, durations, today):
+    """Turn an input row into an insert record, or return a list of errors.
+
+    Rows need name and membership_type; phone, email, start_date and
+    end_date are optional. A missing start date means today and a missing
+    end date is derived from the plan's duration, as add_member does.
+    """
+    if not isinstance(row, dict):
+        return None, [f"Unreadable row: {row}"]
+
+    name = _field(row, "name")
+    phone = _field(row, "phone")
+    email = _field(row, "email")
+    membership_type = _field(row, "membership_type")
+    start_date = _field(row, "start_date") or today.strftime("%Y-%m-%d")
+    end_date = _field(row, "end_date")
+
+    if not end_date and membership_type in durations:
+        try:
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            end_date = (start + timedelta(days=durations[membership_type])).strftime("%Y-%m-%d")
+        except ValueError:
+            # Reported by validate_member below
+            pass
+
+    errors = validate_member(
+        name, phone, email, membership_type, start_date, end_date,
+        check_dates=True, membership_types=durations
+    )
+    if errors:
+        return None, errors
+    return (name, phone or None, email or None, start_date, end_date, membership_type), None
+
+def import_members(db, rows, batch_size=BATCH_SIZE, today=None, progress=None, branch_id=None):
+    """Validate and insert (row number, row) pairs in batched transactions.
+
+    Members go to `branch_id`, or the database's default branch. Invalid
+    rows are reported in the result and skipped; they never abort the load.
+    If a batch fails inside SQLite it is retried row by row so only the
+    offending rows are lost. `progress(result)` is called after each batch.
+    """
+    today = today or date.today()
+    durations = {t['name']: t['duration'] for t in db.get_membership_types()}
+    result = ImportResult()
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        for number, row in chunk:
+            record, errors = prepare_member(row, durations, today)
+            if errors:
+                result.add_error(number, errors)
+            else:
+                batch.append((number, record))
+
+        if batch:
+            success, message = db.insert_members([record for _, record in batch], branch_id)
+            if success:
+                result.inserted += len(batch)
+            else:
+                for number, record in batch:
+                    success, message = db.insert_members([record], branch_id)
+                    if success:
+                        result.inserted += 1
+                    else:
+                        result.add_error(number, [message])
+
+        if progress:
+            progress(result)
+
+    return result
+
+def import_file(db, path, format=None, batch_size=BATCH_SIZE, progress=None, branch_id=None):
+    """Import members from a CSV or JSONL file"""
+    return import_members(db, read_rows(path, format), batch_size, progress=progress, branch_id=branch_id)
+
+if __name__ == "__main__":
+    import argparse
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Import members from CSV or JSONL")
+    parser.add_argument("file")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--format", choices=sorted(READERS))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--branch", type=int, help="branch id (default: the database's own branch)")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    result = import_file(
+        db, args.file, args.format, args.batch_size,
+        progress=lambda r: print(f"\r{r.inserted} imported, {r.failed} rejected", end="", flush=True),
+        branch_id=args.branch
+    )
+    print()
+    for number, messages in result.errors:
+        print(f"Row {number}: {'; '.join(messages)}")
+    db.close()
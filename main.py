@@ -1,14 +1,20 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, PhotoImage
-import ttkthemes as ttkth
+from tkinter import ttk, messagebox, filedialog, PhotoImage
 from datetime import datetime
+import importlib.util
 import os
 import sys
-from functools import cmp_to_key
+import time
 
-from database import Database
+from branches import branch_path
+from database import Database, expiry_cutoff_day, member_matches_search, member_sort_key
+from db_executor import DatabaseExecutor
+from expiry import ExpiryEngine
+from profiling import Profiler
+from reminders import ReminderScheduler, FileOutbox, DEFAULT_OUTBOX_DIR
 from ui_components import (
     ModernButton, SearchBox, MemberForm, MemberDetailsView, StatusBar,
+    VirtualTreeview, ListSource, PagedSource, DashboardPanel, DiagnosticsView,
     PRIMARY_COLOR, SECONDARY_COLOR, BACKGROUND_COLOR, ACCENT_COLOR, TEXT_COLOR, LIGHT_TEXT_COLOR
 )
 
@@ -20,28 +26,140 @@ TABLE_ROW_ODD = "#FFFFFF"  # White for odd rows
 BUTTON_ADD_BG = "#27AE60"  # Green for add button
 BUTTON_REFRESH_BG = "#3498DB"  # Blue for refresh button
 
+# Days-left filter options mapped to Database.DAYS_FILTERS names
+DAYS_FILTERS = {
+    "All": None,
+    "Expired (0)": "expired",
+    "Critical (1-3)": "critical",
+    "This Week (1-7)": "week",
+    "This Month (1-30)": "month",
+}
+
+# Column headings that re-sort the list when clicked, mapped to MEMBER_SORTS names
+SORTABLE_COLUMNS = {
+    "name": "name",
+    "end_date": "end_date",
+    "days_remaining": "expiry",
+}
+
+# Searches with at most this many matches are kept in memory, so typing more
+# characters narrows them without another query
+SEARCH_CACHE_LIMIT = 2000
+
+# Branch selector entry for every member of the open database
+ALL_BRANCHES = "All branches"
+
+# Dashboard figures also change through other terminals, so poll now and then
+DASHBOARD_REFRESH_MS = 60 * 1000
+
+# Initial window size; the header takes 15% of its height
+WINDOW_WIDTH = 1000
+WINDOW_HEIGHT = 600
+HEADER_HEIGHT = int(WINDOW_HEIGHT * 0.15)
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.png")
+
+# Startup is reported once all of these have happened (see _mark_startup)
+STARTUP_STEPS = ("window", "styled", "members")
+
 class FitGymApp:
-    def __init__(self, root):
+    def __init__(self, root, started=None, db_file="fitgym.db"):
+        """Build the window; `started` is the perf_counter() value at process
+        start (run.py passes it) so startup can be timed from there."""
         self.root = root
+        self.db_file = db_file
         self.root.title("FitGym Membership Manager")
-        self.root.geometry("1000x600")
+        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.root.minsize(800, 500)
+        self.started = started if started is not None else time.perf_counter()
+        self._startup = {}
         
-        # Initialize database
-        self.db = Database()
+        # Timings of database calls and list rendering for the diagnostics window
+        self.profiler = Profiler()
         
-        # Apply theme
-        self.style = ttkth.ThemedStyle(self.root)
-        self.style.set_theme("arc")
-        
-        # Configure custom styles
+        # Initialize database on its own worker thread; the UI only talks to it
+        # through db_executor so slow queries never block the event loop
+        self.db_executor = DatabaseExecutor(
+            self.root, lambda: Database(db_file, profiler=self.profiler), on_busy=self._on_db_busy
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        
+        # Branches of the main database; branch_id limits the views to one
+        # branch sharing the open file (None for all of them) and open_file is
+        # the branch file the database thread is on, if any
+        self.branches = []
+        self.branch_id = None
+        self.open_file = None
+        
+        # Current list view: search text (None for all members) and sort order
+        self.search_term = None
+        self.sort_order = "expiry"
+        self._count_request = None
+        self._search_cache = None
+        
+        # Flip lapsed memberships to expired once per day, so reads never write
+        self._schedule_expiry_sweep()
+        
+        # Configure custom styles on the default theme for now
+        self.style = ttk.Style(self.root)
         self._configure_styles()
         
         # Create UI
         self._create_widgets()
         
-        # Load initial data
+        # Load initial data (the query runs on the database thread)
         self._load_members()
+        self.db_executor.submit(Database.get_branches, on_done=self._set_branches)
+        self._schedule_dashboard_refresh()
+        
+        # The arc theme and the logo are slow to load, so they follow once the
+        # plain window has been drawn (after the first round of idle tasks)
+        self.root.after_idle(lambda: self.root.after(0, self._finish_startup))
+    
+    def _finish_startup(self):
+        """Apply the theme and show the logo once the window is on screen"""
+        self._mark_startup("window")
+        self._apply_theme()
+        self._load_logo()
+        self._mark_startup("styled")
+    
+    def _mark_startup(self, step):
+        """Record when a startup step finished and report once all have"""
+        if self._startup is None or step in self._startup:
+            return
+        self._startup[step] = elapsed = time.perf_counter() - self.started
+        self.profiler.record_phase("startup." + step, elapsed)
+        if all(name in self._startup for name in STARTUP_STEPS):
+            print("Startup: " + ", ".join(
+                f"{name} {self._startup[name] * 1000:.0f} ms" for name in STARTUP_STEPS
+            ))
+            self._startup = None
+    
+    def _apply_theme(self):
+        """Switch to the arc theme from ttkthemes, when it is installed"""
+        try:
+            import ttkthemes as ttkth
+        except ImportError:
+            print("ttkthemes is not installed; using the default theme")
+            return
+        self.style = ttkth.ThemedStyle(self.root)
+        self.style.set_theme("arc")
+        # Style settings belong to a theme, so apply ours again on top of arc
+        self._configure_styles()
+    
+    def _load_logo(self):
+        """Show the logo in the header, scaled to fit its height"""
+        try:
+            self.logo_img = PhotoImage(file=LOGO_PATH)
+            # Resize to fit header height
+            logo_height = HEADER_HEIGHT - 20  # Padding
+            ratio = logo_height / self.logo_img.height()
+            new_width = int(self.logo_img.width() * ratio)
+            self.logo_img = self.logo_img.subsample(max(1, int(self.logo_img.width() / new_width)))
+            self.logo_label.configure(image=self.logo_img)
+            self.logo_label.pack(side=tk.LEFT, padx=(20, 10), pady=5, before=self.title_label)
+        except Exception as e:
+            print(f"Error loading logo: {e}")
     
     def _configure_styles(self):
         """Configure custom ttk styles"""
@@ -111,36 +229,23 @@ class FitGymApp:
         header_frame = ttk.Frame(main_container, style="Header.TFrame")
         header_frame.pack(fill=tk.X, pady=(0, 10), ipady=10)
         header_frame.pack_propagate(False)  # Don't shrink
-        # Set the height to 20% of the window height
-        self.root.update()
-        header_height = int(self.root.winfo_height() * 0.15)  # 15% of window height
-        header_frame.configure(height=header_height)
+        # Sized from the initial window height, so no update() to measure it
+        header_frame.configure(height=HEADER_HEIGHT)
         
         # Left side of header (logo and title)
         left_header = ttk.Frame(header_frame, style="Header.TFrame")
         left_header.pack(side=tk.LEFT, fill=tk.Y)
         
-        # Load and display logo
-        try:
-            logo_path = "c:/Users/barcl/Documents/fitgym/logo.png"
-            self.logo_img = PhotoImage(file=logo_path)
-            # Resize to fit header height
-            logo_height = header_height - 20  # Padding
-            ratio = logo_height / self.logo_img.height()
-            new_width = int(self.logo_img.width() * ratio)
-            self.logo_img = self.logo_img.subsample(int(self.logo_img.width() / new_width))
-            logo_label = ttk.Label(left_header, image=self.logo_img, background=HEADER_BG)
-            logo_label.pack(side=tk.LEFT, padx=(20, 10), pady=5)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
+        # Logo, filled in by _load_logo after the window is shown
+        self.logo_label = ttk.Label(left_header, background=HEADER_BG)
         
         # App title
-        title_label = ttk.Label(
+        self.title_label = ttk.Label(
             left_header, 
             text="FitGym Membership Manager", 
             style="Title.TLabel"
         )
-        title_label.pack(side=tk.LEFT, padx=10)
+        self.title_label.pack(side=tk.LEFT, padx=10)
         
         # Right side of header (search and filter)
         right_header = ttk.Frame(header_frame, style="Header.TFrame")
@@ -154,15 +259,32 @@ class FitGymApp:
         
         self.days_filter_var = tk.StringVar(value="All")
         days_filter = ttk.Combobox(filter_frame, textvariable=self.days_filter_var, 
-                                  values=["All", "Expired (0)", "Critical (1-3)", "This Week (1-7)", "This Month (1-30)"], 
+                                  values=list(DAYS_FILTERS), 
                                   width=15, state="readonly")
         days_filter.pack(side=tk.LEFT)
         days_filter.bind("<<ComboboxSelected>>", self._apply_filter)
         
+        # Branch selector, shown by _set_branches once there is more than one
+        self.branch_label = ttk.Label(filter_frame, text="Branch:", style="Header.TLabel")
+        self.branch_var = tk.StringVar(value=ALL_BRANCHES)
+        self.branch_select = ttk.Combobox(filter_frame, textvariable=self.branch_var,
+                                          values=[ALL_BRANCHES], width=15, state="readonly")
+        self.branch_select.bind("<<ComboboxSelected>>", self._select_branch)
+        
         # Search box
-        self.search_box = SearchBox(right_header, command=self._search_members, placeholder="Search by name...")
+        self.search_box = SearchBox(
+            right_header,
+            command=self._search_members,
+            placeholder="Search by name...",
+            live=True,
+            on_clear=self._load_members
+        )
         self.search_box.pack(side=tk.TOP, fill=tk.X, pady=5)
         
+        # Live membership figures
+        self.dashboard = DashboardPanel(main_container)
+        self.dashboard.pack(fill=tk.X, pady=(0, 10))
+        
         # Content frame
         content_frame = ttk.Frame(main_container)
         content_frame.pack(fill=tk.BOTH, expand=True)
@@ -192,34 +314,35 @@ class FitGymApp:
         )
         refresh_button.pack(side=tk.LEFT, padx=5, pady=5)
         
+        # Diagnostics window (also F12)
+        diagnostics_button = ModernButton(
+            button_frame,
+            text="Diagnostics",
+            command=self._show_diagnostics
+        )
+        diagnostics_button.pack(side=tk.RIGHT, pady=5)
+        self.root.bind("<F12>", lambda event: self._show_diagnostics())
+        
         # Status bar
         self.status_bar = StatusBar(main_container)
         self.status_bar.pack(fill=tk.X, pady=(10, 0))
     
     def _create_treeview(self, parent):
         """Create and configure the treeview for displaying members"""
-        # Create a frame with scrollbar
-        tree_frame = ttk.Frame(parent)
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
         # Treeview
         columns = (
             "id", "name", "phone", "email", "membership_type", 
             "start_date", "end_date", "days_remaining", "status"
         )
-        self.tree = ttk.Treeview(
-            tree_frame, 
+        # Only the rows on screen exist as Treeview items; the rest are paged in on scroll
+        self.member_list = VirtualTreeview(
+            parent,
             columns=columns,
-            show="headings",
-            yscrollcommand=scrollbar.set
+            format_row=self._format_member_row,
+            row_key=lambda member: member.id
         )
-        
-        # Configure scrollbar
-        scrollbar.config(command=self.tree.yview)
+        self.member_list.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.member_list.tree
         
         # Define column widths and headings with improved names
         self.tree.column("id", width=50, anchor=tk.CENTER)
@@ -242,8 +365,8 @@ class FitGymApp:
         self.tree.heading("days_remaining", text="Days Left")
         self.tree.heading("status", text="Status")
         
-        # Pack the treeview
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        for column, sort in SORTABLE_COLUMNS.items():
+            self.tree.heading(column, command=lambda sort=sort: self._sort_members(sort))
         
         # Bind double-click event
         self.tree.bind("<Double-1>", self._on_member_double_click)
@@ -251,89 +374,257 @@ class FitGymApp:
         # Configure row colors for alternating rows
         self.tree.tag_configure("evenrow", background=TABLE_ROW_EVEN)
         self.tree.tag_configure("oddrow", background=TABLE_ROW_ODD)
-    
-    def _load_members(self):
-        """Load all members from database into treeview"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Get members from database
-        members = self.db.get_all_members()
-        
-        # Apply days filter if set
-        members = self._filter_by_days(members)
-        
-        # Sort members: first by days_remaining (ascending), then by name
-        # Members with 0 days should appear at the bottom
-        def compare_members(a, b):
-            # Put expired members (0 days) at the bottom
-            if a["days_remaining"] == 0 and b["days_remaining"] > 0:
-                return 1
-            elif a["days_remaining"] > 0 and b["days_remaining"] == 0:
-                return -1
-            # For non-expired members, sort by days remaining (ascending)
-            elif a["days_remaining"] != b["days_remaining"]:
-                return a["days_remaining"] - b["days_remaining"]
-            # If days remaining are equal, sort by name
-            else:
-                return -1 if a["name"].lower() < b["name"].lower() else 1
-        
-        members.sort(key=cmp_to_key(compare_members))
-        
-        # Insert into treeview with alternating row colors
-        for i, member in enumerate(members):
-            values = (
-                member["id"],
-                member["name"],
-                member["phone"] or "",
-                member["email"] or "",
-                member["membership_type"],
-                member["start_date"],
-                member["end_date"],
-                member["days_remaining"],
-                member["status"].capitalize()
-            )
-            
-            # Set tag based on days remaining
-            if member["days_remaining"] == 0:
-                tag = "expired"
-            elif member["days_remaining"] == 1:
-                tag = "one_day"
-            elif member["days_remaining"] == 2:
-                tag = "two_days"
-            elif member["days_remaining"] == 3:
-                tag = "three_days"
-            else:
-                tag = "evenrow" if i % 2 == 0 else "oddrow"
-            
-            self.tree.insert("", tk.END, values=values, tags=(tag,))
         
         # Configure row colors with more vibrant colors and black text
         self.tree.tag_configure("expired", background="#FFCCCC", foreground="black")  # Changed text color to black
         self.tree.tag_configure("one_day", background="#FFAA99", foreground="black")  # Changed text color to black
         self.tree.tag_configure("two_days", background="#FFD699", foreground="black")  # Changed text color to black
         self.tree.tag_configure("three_days", background="#FFFFAA", foreground="black")  # Changed text color to black
+    
+    def _format_member_row(self, member, index):
+        """Return the Treeview values and tags for a member at a list position"""
+        days_remaining = member.days_remaining
+        values = (
+            member.id,
+            member.name,
+            member.phone or "",
+            member.email or "",
+            member.membership_type,
+            member.start_date,
+            member.end_date,
+            days_remaining,
+            member.status.capitalize()
+        )
         
-        # Update status
-        self.status_bar.set_status(f"Loaded {len(members)} members")
-    
-    def _filter_by_days(self, members):
-        """Filter members by days remaining based on selected filter"""
-        filter_value = self.days_filter_var.get()
-        
-        if filter_value == "All":
-            return members
-        elif filter_value == "Expired (0)":
-            return [m for m in members if m["days_remaining"] == 0]
-        elif filter_value == "Critical (1-3)":
-            return [m for m in members if 1 <= m["days_remaining"] <= 3]
-        elif filter_value == "This Week (1-7)":
-            return [m for m in members if 1 <= m["days_remaining"] <= 7]
-        elif filter_value == "This Month (1-30)":
-            return [m for m in members if 1 <= m["days_remaining"] <= 30]
+        # Set tag based on days remaining
+        if days_remaining == 0:
+            tag = "expired"
+        elif days_remaining == 1:
+            tag = "one_day"
+        elif days_remaining == 2:
+            tag = "two_days"
+        elif days_remaining == 3:
+            tag = "three_days"
         else:
-            return members
+            tag = "evenrow" if index % 2 == 0 else "oddrow"
+        
+        return values, (tag,)
+    
+    def _schedule_expiry_sweep(self):
+        """Run the daily expiry sweep and reminder run if due, then check again later"""
+        # Reminders are queued in the outbox folder next to the main database
+        outbox = FileOutbox(os.path.join(os.path.dirname(os.path.abspath(self.db_file)), DEFAULT_OUTBOX_DIR))
+        self.db_executor.submit(lambda db: ExpiryEngine(db).run())
+        # A branch file also holds the members synced from other branches;
+        # those are reminded by their own branch
+        self.db_executor.submit(lambda db: ReminderScheduler(
+            db, outbox, branch_id=db.default_branch_id if db.is_branch_file else None
+        ).run())
+        self.root.after(ExpiryEngine.CHECK_INTERVAL_MS, self._schedule_expiry_sweep)
+    
+    def _refresh_dashboard(self):
+        """Reload the dashboard figures from the summary tables"""
+        self.db_executor.submit(
+            Database.get_dashboard_stats, None, self.branch_id, on_done=self.dashboard.update_stats
+        )
+    
+    def _schedule_dashboard_refresh(self):
+        """Refresh the dashboard every DASHBOARD_REFRESH_MS"""
+        def tick():
+            self._refresh_dashboard()
+            self._schedule_dashboard_refresh()
+        self.root.after(DASHBOARD_REFRESH_MS, tick)
+    
+    def _on_db_busy(self, busy):
+        """Show the loading indicator while database calls are running"""
+        if hasattr(self, "status_bar"):
+            self.status_bar.set_busy(busy)
+    
+    def _show_diagnostics(self):
+        """Open the diagnostics window with the profiler's figures"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Diagnostics")
+        dialog.geometry("800x500")
+        dialog.transient(self.root)
+        
+        view = DiagnosticsView(dialog, self.profiler, on_save=lambda: self._save_diagnostics(dialog))
+        view.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    
+    def _save_diagnostics(self, parent=None):
+        """Write the profiler's figures to a JSON file chosen by the user"""
+        path = filedialog.asksaveasfilename(
+            parent=parent,
+            title="Save diagnostics report",
+            defaultextension=".json",
+            initialfile=f"fitgym-diagnostics-{datetime.now():%Y%m%d-%H%M%S}.json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.profiler.dump(path)
+            self.status_bar.set_status(f"Diagnostics saved to {path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save diagnostics: {e}", parent=parent)
+    
+    def _on_close(self):
+        """Let queued database work finish before closing the window"""
+        self.db_executor.shutdown()
+        self.root.destroy()
+    
+    def _set_branches(self, branches):
+        """Fill the branch selector; a single branch needs no selector"""
+        self.branches = branches
+        self.branch_select.configure(values=[ALL_BRANCHES] + [branch["name"] for branch in branches])
+        if len(branches) > 1:
+            self.branch_label.pack(side=tk.LEFT, padx=(10, 5))
+            self.branch_select.pack(side=tk.LEFT)
+    
+    def _select_branch(self, event=None):
+        """Show one branch: a filter on the shared database, or its own file"""
+        name = self.branch_var.get()
+        branch = next((branch for branch in self.branches if branch["name"] == name), None)
+        db_file = branch_path(self.db_file, branch) if branch and branch["db_file"] else None
+        if db_file and not os.path.exists(db_file):
+            # Opening it would create an empty branch database
+            messagebox.showerror("Error", f"The database of branch {name} was not found:\n{db_file}")
+            return
+        self.branch_id = branch["id"] if branch and not db_file else None
+        
+        if db_file != self.open_file:
+            # Queued behind any running call; the reload below follows it
+            if self._count_request:
+                self._count_request.cancel()
+                self._count_request = None
+            path = db_file or self.db_file
+            previous = self.open_file
+            
+            def failed(error):
+                # The database thread stays on the file it had
+                self.open_file = previous
+                messagebox.showerror("Error", f"Could not open {path}: {error}")
+            
+            self.db_executor.reopen(lambda: Database(path, profiler=self.profiler), on_error=failed)
+            self.open_file = db_file
+        self._load_members()
+    
+    def _load_members(self):
+        """Load all members from database into treeview"""
+        def loaded(total):
+            self.status_bar.set_status(f"Loaded {total} members")
+            self._mark_startup("members")
+        
+        self.search_term = None
+        self._show_members(loaded)
+        self._refresh_dashboard()
+    
+    def _show_members(self, on_loaded=None):
+        """Point the member list at the current search, filter and sort"""
+        # Members are filtered and sorted in SQL and fetched a page at a time
+        days_filter = DAYS_FILTERS.get(self.days_filter_var.get())
+        search_term = self.search_term
+        sort = self.sort_order
+        branch_id = self.branch_id
+        self._search_cache = None
+        
+        # Python mirror of the SQL order, used to re-position edited rows
+        cutoff = expiry_cutoff_day()
+        key = lambda member: member_sort_key(member, sort, cutoff)
+        
+        def fetch_page(db, limit, **position):
+            return db.query_members(days_filter, search_term, sort, limit, branch_id=branch_id, **position)
+        
+        def fetch_view(db):
+            # Small search results are loaded whole so refinements can filter them
+            total = db.count_members(days_filter, search_term, branch_id)
+            rows = None
+            if search_term is not None and db.has_search_index and total <= SEARCH_CACHE_LIMIT:
+                rows = db.query_members(days_filter, search_term, sort, limit=total, branch_id=branch_id)
+            return total, rows
+        
+        # Profiler phases: query (until the result is back on the Tk thread),
+        # render (building the visible rows) and paint (until Tk is idle again)
+        phase = "members.search" if search_term is not None else "members.load"
+        requested = time.perf_counter()
+        
+        def show(view):
+            total, rows = view
+            self._count_request = None
+            self.profiler.record_phase(phase + ".query", time.perf_counter() - requested)
+            rendering = time.perf_counter()
+            with self.profiler.phase(phase + ".render"):
+                if rows is None:
+                    self.member_list.set_source(
+                        PagedSource(fetch_page, total, key, submit=self.db_executor.submit)
+                    )
+                else:
+                    self._search_cache = {"term": search_term, "view": (days_filter, sort, branch_id), "rows": rows, "key": key}
+                    self.member_list.set_source(ListSource(rows, key))
+                if on_loaded:
+                    on_loaded(total)
+            self.root.after_idle(
+                lambda: self.profiler.record_phase(phase + ".paint", time.perf_counter() - rendering)
+            )
+        
+        # A newer view supersedes any request still in flight
+        if self._count_request:
+            self._count_request.cancel()
+        self._count_request = self.db_executor.submit(fetch_view, on_done=show, interruptible=True)
+    
+    def _refine_search(self, search_term):
+        """Narrow the cached results of a shorter search term in memory.
+        
+        Returns False when the cache cannot answer this search.
+        """
+        cache = self._search_cache
+        view = (DAYS_FILTERS.get(self.days_filter_var.get()), self.sort_order, self.branch_id)
+        if not cache or cache["view"] != view or not search_term.startswith(cache["term"]):
+            return False
+        
+        # Drop any query the user has typed past
+        if self._count_request:
+            self._count_request.cancel()
+            self._count_request = None
+        
+        with self.profiler.phase("members.search.refine"):
+            rows = [member for member in cache["rows"] if member_matches_search(member, search_term)]
+            self._search_cache = dict(cache, term=search_term, rows=rows)
+            self.search_term = search_term
+            self.member_list.set_source(ListSource(rows, cache["key"]))
+            self.status_bar.set_status(f"Found {len(rows)} matching '{search_term}'")
+        return True
+    
+    def _apply_member_change(self, member_id, is_new=False):
+        """Update just the affected row after a member was added, edited or deleted"""
+        days_filter = DAYS_FILTERS.get(self.days_filter_var.get())
+        search_term = self.search_term
+        branch_id = self.branch_id
+        source = self.member_list.source
+        
+        def fetch_change(db):
+            return (
+                db.get_member_if_matches(member_id, days_filter, search_term, branch_id),
+                db.count_members(days_filter, search_term, branch_id)
+            )
+        
+        def apply(change):
+            # A view that was replaced meanwhile already reflects the change
+            if self.member_list.source is not source:
+                return
+            member, total = change
+            self.member_list.apply_change(member_id, member, total, is_new)
+            if search_term is None:
+                self.status_bar.set_status(f"Loaded {total} members")
+            else:
+                self.status_bar.set_status(f"Found {total} matching '{search_term}'")
+        
+        self.db_executor.submit(fetch_change, on_done=apply)
+        self._refresh_dashboard()
+    
+    def _sort_members(self, sort):
+        """Re-sort the current list when a column heading is clicked"""
+        self.sort_order = sort
+        self._show_members()
     
     def _apply_filter(self, event=None):
         """Apply the days filter when changed"""
@@ -341,88 +632,34 @@ class FitGymApp:
     
     def _search_members(self, search_term):
         """Search members by name, phone, or email"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Get search results
-        members = self.db.search_members(search_term)
-        
-        # Apply days filter if set
-        members = self._filter_by_days(members)
-        
-        # Sort members: first by days_remaining (ascending), then by name
-        # Members with 0 days should appear at the bottom
-        def compare_members(a, b):
-            # Put expired members (0 days) at the bottom
-            if a["days_remaining"] == 0 and b["days_remaining"] > 0:
-                return 1
-            elif a["days_remaining"] > 0 and b["days_remaining"] == 0:
-                return -1
-            # For non-expired members, sort by days remaining (ascending)
-            elif a["days_remaining"] != b["days_remaining"]:
-                return a["days_remaining"] - b["days_remaining"]
-            # If days remaining are equal, sort by name
-            else:
-                return -1 if a["name"].lower() < b["name"].lower() else 1
-        
-        members.sort(key=cmp_to_key(compare_members))
-        
-        # Insert into treeview with alternating row colors
-        for i, member in enumerate(members):
-            values = (
-                member["id"],
-                member["name"],
-                member["phone"] or "",
-                member["email"] or "",
-                member["membership_type"],
-                member["start_date"],
-                member["end_date"],
-                member["days_remaining"],
-                member["status"].capitalize()
-            )
-            
-            # Set tag based on days remaining
-            if member["days_remaining"] == 0:
-                tag = "expired"
-            elif member["days_remaining"] == 1:
-                tag = "one_day"
-            elif member["days_remaining"] == 2:
-                tag = "two_days"
-            elif member["days_remaining"] == 3:
-                tag = "three_days"
-            else:
-                tag = "evenrow" if i % 2 == 0 else "oddrow"
-            
-            self.tree.insert("", tk.END, values=values, tags=(tag,))
+        if self._refine_search(search_term):
+            return
         
-        # Update status
-        self.status_bar.set_status(f"Found {len(members)} matching '{search_term}'")
+        self.search_term = search_term
+        self._show_members(
+            lambda total: self.status_bar.set_status(f"Found {total} matching '{search_term}'")
+        )
 
     def _on_member_double_click(self, event):
         """Handle double-click on a member row"""
-        # Get selected item
-        selection = self.tree.selection()
-        if not selection:
+        # Get selected member
+        selected = self.member_list.selected_row()
+        if not selected:
             return
         
-        # Get member ID
-        item = self.tree.item(selection[0])
-        member_id = item["values"][0]
+        # Get member details, then show them in a dialog
+        def show(member):
+            if not member:
+                messagebox.showerror("Error", "Member not found")
+                return
+            self._show_member_details(member)
         
-        # Get member details
-        member = self.db.get_member(member_id)
-        if not member:
-            messagebox.showerror("Error", "Member not found")
-            return
-        
-        # Show member details dialog
-        self._show_member_details(member)
+        self.db_executor.submit(Database.get_member, selected.id, on_done=show)
     
     def _show_member_details(self, member):
         """Show dialog with member details"""
         dialog = tk.Toplevel(self.root)
-        dialog.title(f"Member: {member['name']}")
+        dialog.title(f"Member: {member.name}")
         dialog.geometry("400x400")
         dialog.resizable(False, False)
         dialog.transient(self.root)
@@ -448,8 +685,10 @@ class FitGymApp:
     def _show_add_member_form(self):
         """Show dialog for adding a new member"""
         # Get membership types
-        membership_types = self.db.get_membership_types()
-        
+        self.db_executor.submit(Database.get_membership_types, on_done=self._open_add_member_form)
+    
+    def _open_add_member_form(self, membership_types):
+        """Build the add-member dialog once membership types are loaded"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Add New Member")
         dialog.geometry("400x350")
@@ -472,10 +711,15 @@ class FitGymApp:
     def _show_edit_member_form(self, member):
         """Show dialog for editing a member"""
         # Get membership types
-        membership_types = self.db.get_membership_types()
-        
+        self.db_executor.submit(
+            Database.get_membership_types,
+            on_done=lambda membership_types: self._open_edit_member_form(member, membership_types)
+        )
+    
+    def _open_edit_member_form(self, member, membership_types):
+        """Build the edit-member dialog once membership types are loaded"""
         dialog = tk.Toplevel(self.root)
-        dialog.title(f"Edit Member: {member['name']}")
+        dialog.title(f"Edit Member: {member.name}")
         dialog.geometry("400x400")
         dialog.resizable(False, False)
         dialog.transient(self.root)
@@ -501,24 +745,38 @@ class FitGymApp:
     
     def _add_member(self, data):
         """Add a new member to the database"""
-        success, result = self.db.add_member(
+        def done(outcome):
+            success, result = outcome
+            if success:
+                messagebox.showinfo("Success", f"Member {data['name']} added successfully")
+                self._apply_member_change(result, is_new=True)
+            else:
+                messagebox.showerror("Error", f"Failed to add member: {result}")
+        
+        self.db_executor.submit(
+            Database.add_member,
             data["name"], 
             data["phone"], 
             data["email"], 
-            data["membership_type"]
+            data["membership_type"],
+            self.branch_id,
+            on_done=done
         )
-        
-        if success:
-            messagebox.showinfo("Success", f"Member {data['name']} added successfully")
-            self._load_members()
-        else:
-            messagebox.showerror("Error", f"Failed to add member: {result}")
     
     def _update_member(self, data):
         """Update an existing member"""
+        def done(outcome):
+            success, result = outcome
+            if success:
+                messagebox.showinfo("Success", f"Member {data['name']} updated successfully")
+                self._apply_member_change(data["id"])
+            else:
+                messagebox.showerror("Error", f"Failed to update member: {result}")
+        
         # If start_date and end_date are provided, update them directly
         if "start_date" in data and "end_date" in data:
-            success, result = self.db.update_member_dates(
+            self.db_executor.submit(
+                Database.update_member_dates,
                 data["id"],
                 data["name"], 
                 data["phone"], 
@@ -526,42 +784,41 @@ class FitGymApp:
                 data["membership_type"],
                 data["start_date"],
                 data["end_date"],
-                data["extend_days"]
+                data["extend_days"],
+                on_done=done
             )
         else:
-            success, result = self.db.update_member(
+            self.db_executor.submit(
+                Database.update_member,
                 data["id"],
                 data["name"], 
                 data["phone"], 
                 data["email"], 
                 data["membership_type"],
-                data["extend_days"]
+                data["extend_days"],
+                on_done=done
             )
-        
-        if success:
-            messagebox.showinfo("Success", f"Member {data['name']} updated successfully")
-            self._load_members()
-        else:
-            messagebox.showerror("Error", f"Failed to update member: {result}")
     
     def _delete_member(self, member_id):
         """Delete a member from the database"""
-        success, result = self.db.delete_member(member_id)
+        def done(outcome):
+            success, result = outcome
+            if success:
+                messagebox.showinfo("Success", result)
+                self._apply_member_change(member_id)
+            else:
+                messagebox.showerror("Error", f"Failed to delete member: {result}")
         
-        if success:
-            messagebox.showinfo("Success", result)
-            self._load_members()
-        else:
-            messagebox.showerror("Error", f"Failed to delete member: {result}")
+        self.db_executor.submit(Database.delete_member, member_id, on_done=done)
 
 if __name__ == "__main__":
+    started = time.perf_counter()
+    
     # Create root window
     root = tk.Tk()
     
-    # Check if ttkthemes is installed
-    try:
-        import ttkthemes
-    except ImportError:
+    # Without ttkthemes _apply_theme keeps the default theme
+    if importlib.util.find_spec("ttkthemes") is None:
         messagebox.showwarning(
             "Missing Dependency", 
             "The ttkthemes package is not installed. The application will use the default theme.\n\n"
@@ -569,7 +826,7 @@ if __name__ == "__main__":
         )
     
     # Create application
-    app = FitGymApp(root)
+    app = FitGymApp(root, started)
     
     # Start main loop
     root.mainloop()
\ No newline at end of file
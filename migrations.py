@@ -0,0 +1,575 @@
+import sqlite3
+
+# Each migration upgrades the schema by exactly one version. The current
+# version is stored in PRAGMA user_version, so existing databases are
+# upgraded in place by running only the steps they have not seen yet.
+# Never edit a released step; append a new one instead.
+
+def _create_base_schema(cursor):
+    """Version 1: the original members/membership_types tables"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            membership_type TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS membership_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            price REAL NOT NULL,
+            description TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+    # Insert default membership types if table is empty
+    cursor.execute("SELECT COUNT(*) FROM membership_types")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO membership_types (name, duration, price, description)
+            VALUES
+            ('Monthly', 30, 50.00, 'Standard monthly membership'),
+            ('Quarterly', 90, 130.00, 'Three month membership'),
+            ('Annual', 365, 450.00, 'Full year membership')
+        ''')
+
+def _add_lookup_indexes(cursor):
+    """Version 2: indexes for search, expiry scans and plan lookups"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_name ON members (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_phone ON members (phone)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_email ON members (email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_end_date ON members (end_date)")
+    # Serves the expiry sweep: status = 'active' AND end_date <= ?
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_status ON members (status, end_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_membership_types_name ON membership_types (name)")
+    cursor.execute("ANALYZE")
+
+# Phone numbers are stored as typed ("(555) 123-4567"); strip the characters
+# MemberForm allows so digit prefixes match regardless of formatting.
+PHONE_DIGITS_SQL = (
+    "replace(replace(replace(replace(replace(coalesce({0}, ''), "
+    "' ', ''), '-', ''), '(', ''), ')', ''), '+', '')"
+)
+
+def _add_search_index(cursor):
+    """Version 3: FTS5 index over name, email and phone, kept in sync by triggers"""
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+                name, email, phone, phone_digits,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '1 2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; search falls back to LIKE scans
+        return
+
+    new_digits = PHONE_DIGITS_SQL.format("new.phone")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS members_fts_insert AFTER INSERT ON members BEGIN
+            INSERT INTO members_fts (rowid, name, email, phone, phone_digits)
+            VALUES (new.id, new.name, new.email, new.phone, {new_digits});
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS members_fts_delete AFTER DELETE ON members BEGIN
+            DELETE FROM members_fts WHERE rowid = old.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS members_fts_update AFTER UPDATE OF name, email, phone ON members BEGIN
+            UPDATE members_fts
+            SET name = new.name, email = new.email, phone = new.phone, phone_digits = {new_digits}
+            WHERE rowid = new.id;
+        END
+    ''')
+
+    cursor.execute("DELETE FROM members_fts")
+    cursor.execute(f'''
+        INSERT INTO members_fts (rowid, name, email, phone, phone_digits)
+        SELECT id, name, email, phone, {PHONE_DIGITS_SQL.format("phone")} FROM members
+    ''')
+
+def _add_member_list_indexes(cursor):
+    """Version 4: indexes matching the member list's keyset pagination order"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_end_date_name
+        ON members (end_date, name COLLATE NOCASE)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_name_nocase
+        ON members (name COLLATE NOCASE, end_date)
+    ''')
+    cursor.execute("ANALYZE")
+
+# julianday('0001-01-01') is 1721425.5, so this turns a YYYY-MM-DD column
+# into the same day number as Python's date.toordinal()
+DAY_NUMBER_SQL = "CAST(julianday({0}) - 1721424.5 AS INTEGER)"
+
+def _add_day_columns(cursor):
+    """Version 5: integer day numbers generated from the date columns.
+
+    The TEXT dates stay the source of truth; start_day/end_day are virtual
+    generated columns, so they cost nothing to store and cannot drift. Day
+    ranges and the member list order then compare and index plain integers.
+    """
+    for column in ("start", "end"):
+        cursor.execute(f'''
+            ALTER TABLE members ADD COLUMN {column}_day INTEGER
+            GENERATED ALWAYS AS ({DAY_NUMBER_SQL.format(column + "_date")}) VIRTUAL
+        ''')
+
+    # Replace the version 4 list indexes and the expiry sweep index
+    cursor.execute("DROP INDEX IF EXISTS idx_members_end_date_name")
+    cursor.execute("DROP INDEX IF EXISTS idx_members_name_nocase")
+    cursor.execute("DROP INDEX IF EXISTS idx_members_status")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_end_day_name
+        ON members (end_day, name COLLATE NOCASE)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_name_nocase_day
+        ON members (name COLLATE NOCASE, end_day)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_status_day ON members (status, end_day)")
+    cursor.execute("ANALYZE")
+
+def _add_membership_ledger(cursor):
+    """Version 6: membership periods, payments and revenue rollups.
+
+    Every join, extension and plan change becomes a membership_periods row;
+    money taken for it is a payments row. revenue_daily and revenue_monthly
+    are kept up to date by triggers on payments, so revenue reports read a
+    few rollup rows instead of scanning every payment ever made.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS membership_periods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            membership_type TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_membership_periods_member
+        ON membership_periods (member_id, start_date)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            period_id INTEGER REFERENCES membership_periods (id),
+            membership_type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            paid_on TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_member ON payments (member_id, paid_on)")
+
+    for table, period in (("revenue_daily", "day"), ("revenue_monthly", "month")):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {period} TEXT NOT NULL,
+                membership_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                payments INTEGER NOT NULL,
+                PRIMARY KEY ({period}, membership_type)
+            ) WITHOUT ROWID
+        ''')
+
+    # paid_on is YYYY-MM-DD, so its first 7 characters are the month
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS payments_rollup_insert AFTER INSERT ON payments BEGIN
+            INSERT INTO revenue_daily (day, membership_type, amount, payments)
+            VALUES (new.paid_on, new.membership_type, new.amount, 1)
+            ON CONFLICT (day, membership_type) DO UPDATE
+            SET amount = amount + excluded.amount, payments = payments + 1;
+            INSERT INTO revenue_monthly (month, membership_type, amount, payments)
+            VALUES (substr(new.paid_on, 1, 7), new.membership_type, new.amount, 1)
+            ON CONFLICT (month, membership_type) DO UPDATE
+            SET amount = amount + excluded.amount, payments = payments + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS payments_rollup_delete AFTER DELETE ON payments BEGIN
+            UPDATE revenue_daily SET amount = amount - old.amount, payments = payments - 1
+            WHERE day = old.paid_on AND membership_type = old.membership_type;
+            UPDATE revenue_monthly SET amount = amount - old.amount, payments = payments - 1
+            WHERE month = substr(old.paid_on, 1, 7) AND membership_type = old.membership_type;
+        END
+    ''')
+
+    # What was charged before this version is unknown; record the current
+    # period of each member without a payment
+    cursor.execute('''
+        INSERT INTO membership_periods (member_id, kind, membership_type, start_date, end_date)
+        SELECT id, 'join', membership_type, start_date, end_date FROM members
+    ''')
+
+def _add_attendance(cursor):
+    """Version 7: check-in log and a change counter for member data.
+
+    Attendance is written far more often than members change. PRAGMA
+    data_version moves on every commit by another connection, so caches of
+    member data check members_version before throwing anything away.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY,
+            member_id INTEGER NOT NULL,
+            checked_in_at TEXT NOT NULL,
+            door TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attendance_member
+        ON attendance (member_id, checked_in_at)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_time ON attendance (checked_in_at)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO change_counters (name, version) VALUES ('members', 0)")
+    for table in ("members", "membership_types"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE change_counters SET version = version + 1 WHERE name = 'members';
+                END
+            ''')
+
+def _add_member_stats(cursor):
+    """Version 8: member counts kept current by triggers for the dashboard.
+
+    member_stats counts members per (end_day, plan); active/expired and
+    expiring-soon figures are sums over a range of end days, which needs
+    no daily upkeep as the date moves on. signups_daily counts members by
+    start date.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS member_stats (
+            end_day INTEGER NOT NULL,
+            membership_type TEXT NOT NULL,
+            members INTEGER NOT NULL,
+            PRIMARY KEY (end_day, membership_type)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS signups_daily (
+            day TEXT PRIMARY KEY,
+            members INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    add = '''
+        INSERT INTO member_stats (end_day, membership_type, members)
+        VALUES (new.end_day, new.membership_type, 1)
+        ON CONFLICT (end_day, membership_type) DO UPDATE SET members = members + 1;
+    '''
+    remove = '''
+        UPDATE member_stats SET members = members - 1
+        WHERE end_day = old.end_day AND membership_type = old.membership_type;
+    '''
+    add_signup = '''
+        INSERT INTO signups_daily (day, members) VALUES (new.start_date, 1)
+        ON CONFLICT (day) DO UPDATE SET members = members + 1;
+    '''
+    remove_signup = "UPDATE signups_daily SET members = members - 1 WHERE day = old.start_date;"
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS member_stats_insert AFTER INSERT ON members BEGIN
+            {add} {add_signup}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS member_stats_delete AFTER DELETE ON members BEGIN
+            {remove} {remove_signup}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS member_stats_update
+        AFTER UPDATE OF end_date, membership_type ON members BEGIN
+            {remove} {add}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS signups_daily_update AFTER UPDATE OF start_date ON members BEGIN
+            {remove_signup} {add_signup}
+        END
+    ''')
+
+    cursor.execute('''
+        INSERT INTO member_stats (end_day, membership_type, members)
+        SELECT end_day, membership_type, COUNT(*) FROM members GROUP BY end_day, membership_type
+    ''')
+    cursor.execute('''
+        INSERT INTO signups_daily (day, members)
+        SELECT start_date, COUNT(*) FROM members GROUP BY start_date
+    ''')
+
+def _drop_search_index_stats(cursor):
+    """Version 9: forget ANALYZE results for the FTS5 shadow tables.
+
+    Versions 2, 4 and 5 ran ANALYZE while members_fts_data was (nearly)
+    empty. FTS5 looks up its own segments with SQL, and stats claiming that
+    table holds two rows make those lookups scan it, so every insert got
+    slower as the index grew (50k imported members: 14s instead of 1.5s).
+    Without stats the planner uses the rowid lookups FTS5 expects; PRAGMA
+    optimize re-analyzes the tables once they have real sizes. Connections
+    only load stats when opened, see Database.create_tables.
+    """
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        cursor.execute("DELETE FROM sqlite_stat1 WHERE tbl LIKE 'members\\_fts\\_%' ESCAPE '\\'")
+
+def _add_branches(cursor):
+    """Version 10: branches, members.branch_id and per-branch summary counts.
+
+    Existing members belong to branch 1 ("Main"). A branch with a db_file
+    keeps its members in a separate database file of its own (see
+    branches.py); for the others branch_id partitions the shared members
+    table, and the indexes lead with it so a branch's list pages and counts
+    only touch that branch's rows. member_stats and signups_daily are
+    rebuilt with a branch_id so the dashboard can show one branch.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS branches (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            db_file TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO branches (id, name) VALUES (1, 'Main')")
+
+    cursor.execute("ALTER TABLE members ADD COLUMN branch_id INTEGER NOT NULL DEFAULT 1 REFERENCES branches (id)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_branch_end_day
+        ON members (branch_id, end_day, name COLLATE NOCASE)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_members_branch_name
+        ON members (branch_id, name COLLATE NOCASE, end_day)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_members_branch_status ON members (branch_id, status, end_day)")
+
+    for trigger in ("member_stats_insert", "member_stats_delete", "member_stats_update", "signups_daily_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS member_stats")
+    cursor.execute("DROP TABLE IF EXISTS signups_daily")
+
+    cursor.execute('''
+        CREATE TABLE member_stats (
+            branch_id INTEGER NOT NULL,
+            end_day INTEGER NOT NULL,
+            membership_type TEXT NOT NULL,
+            members INTEGER NOT NULL,
+            PRIMARY KEY (branch_id, end_day, membership_type)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE signups_daily (
+            branch_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            members INTEGER NOT NULL,
+            PRIMARY KEY (branch_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+    add = '''
+        INSERT INTO member_stats (branch_id, end_day, membership_type, members)
+        VALUES (new.branch_id, new.end_day, new.membership_type, 1)
+        ON CONFLICT (branch_id, end_day, membership_type) DO UPDATE SET members = members + 1;
+    '''
+    remove = '''
+        UPDATE member_stats SET members = members - 1
+        WHERE branch_id = old.branch_id AND end_day = old.end_day AND membership_type = old.membership_type;
+    '''
+    add_signup = '''
+        INSERT INTO signups_daily (branch_id, day, members) VALUES (new.branch_id, new.start_date, 1)
+        ON CONFLICT (branch_id, day) DO UPDATE SET members = members + 1;
+    '''
+    remove_signup = (
+        "UPDATE signups_daily SET members = members - 1 "
+        "WHERE branch_id = old.branch_id AND day = old.start_date;"
+    )
+
+    cursor.execute(f'''
+        CREATE TRIGGER member_stats_insert AFTER INSERT ON members BEGIN
+            {add} {add_signup}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER member_stats_delete AFTER DELETE ON members BEGIN
+            {remove} {remove_signup}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER member_stats_update
+        AFTER UPDATE OF end_date, membership_type, branch_id ON members BEGIN
+            {remove} {add}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER signups_daily_update AFTER UPDATE OF start_date, branch_id ON members BEGIN
+            {remove_signup} {add_signup}
+        END
+    ''')
+
+    cursor.execute('''
+        INSERT INTO member_stats (branch_id, end_day, membership_type, members)
+        SELECT branch_id, end_day, membership_type, COUNT(*) FROM members
+        GROUP BY branch_id, end_day, membership_type
+    ''')
+    cursor.execute('''
+        INSERT INTO signups_daily (branch_id, day, members)
+        SELECT branch_id, start_date, COUNT(*) FROM members GROUP BY branch_id, start_date
+    ''')
+
+def _add_change_log(cursor):
+    """Version 11: member uids and the change log replicated by sync.py.
+
+    Member ids are local to one database file, so every member also gets a
+    random uid that identifies it on every replica. Each write through
+    Database appends the member's new state (or a delete) to change_log
+    under this database's origin id with the next per-origin seq and a
+    Lamport clock. sync_vector holds the highest seq seen per origin, so a
+    replica can say exactly which entries it is missing.
+    """
+    cursor.execute("ALTER TABLE members ADD COLUMN uid TEXT")
+    cursor.execute("UPDATE members SET uid = lower(hex(randomblob(16)))")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_members_uid ON members (uid)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            origin TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            clock INTEGER NOT NULL,
+            uid TEXT NOT NULL,
+            op TEXT NOT NULL,
+            name TEXT,
+            phone TEXT,
+            email TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            membership_type TEXT,
+            branch_id INTEGER,
+            PRIMARY KEY (origin, seq)
+        ) WITHOUT ROWID
+    ''')
+    # The newest entry of a member decides its state; MAX(clock) gives the next clock
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_uid ON change_log (uid, clock, origin)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_clock ON change_log (clock)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_vector (
+            origin TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_log_vector AFTER INSERT ON change_log BEGIN
+            INSERT INTO sync_vector (origin, seq) VALUES (new.origin, new.seq)
+            ON CONFLICT (origin) DO UPDATE SET seq = MAX(seq, excluded.seq);
+        END
+    ''')
+    cursor.execute(
+        "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('sync_origin', lower(hex(randomblob(8))))"
+    )
+
+def _add_sent_reminders(cursor):
+    """Version 12: expiry reminders already sent, so each is sent only once.
+
+    A reminder is keyed by the membership end it was about, so a renewed
+    membership gets a fresh set. threshold is the days-left window (7, 3, 1
+    or 0, see reminders.py) the member had entered.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sent_reminders (
+            member_id INTEGER NOT NULL,
+            end_day INTEGER NOT NULL,
+            threshold INTEGER NOT NULL,
+            sent_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (member_id, end_day, threshold)
+        ) WITHOUT ROWID
+    ''')
+
+MIGRATIONS = [
+    (1, _create_base_schema),
+    (2, _add_lookup_indexes),
+    (3, _add_search_index),
+    (4, _add_member_list_indexes),
+    (5, _add_day_columns),
+    (6, _add_membership_ledger),
+    (7, _add_attendance),
+    (8, _add_member_stats),
+    (9, _drop_search_index_stats),
+    (10, _add_branches),
+    (11, _add_change_log),
+    (12, _add_sent_reminders),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """Return the schema version recorded in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply all pending migrations, each in its own transaction.
+
+    Returns the list of versions that were applied.
+    """
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"Database schema version {current} is newer than this application ({SCHEMA_VERSION})"
+        )
+
+    applied = []
+    for version, step in MIGRATIONS:
+        if version <= current:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            # Take the write lock up front and re-check: another process
+            # sharing the file may have applied this step meanwhile
+            cursor.execute("BEGIN IMMEDIATE")
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(cursor)
+            # PRAGMA does not accept bound parameters
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    return applied
@@ -0,0 +1,69 @@
+from datetime import date
+
+class Member:
+    """A member row with dates held as ordinals (date.toordinal())
+
+    Records are read-only snapshots shared between caches and views, so they
+    must not be modified. The YYYY-MM-DD strings and days_remaining are
+    computed on access instead of for every row fetched.
+    """
+    __slots__ = ("id", "name", "phone", "email", "start_ordinal", "end_ordinal",
+                 "membership_type", "status", "branch_id")
+
+    def __init__(self, id, name, phone, email, start_ordinal, end_ordinal, membership_type, status,
+                 branch_id=1):
+        self.id = id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.start_ordinal = start_ordinal
+        self.end_ordinal = end_ordinal
+        self.membership_type = membership_type
+        self.status = status
+        self.branch_id = branch_id
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row_factory for SELECTs of database.MEMBER_SELECT"""
+        return cls(*row)
+
+    @property
+    def start_date(self):
+        return date.fromordinal(self.start_ordinal).isoformat()
+
+    @property
+    def end_date(self):
+        return date.fromordinal(self.end_ordinal).isoformat()
+
+    @property
+    def days_remaining(self):
+        return self.days_remaining_on(date.today())
+
+    def days_remaining_on(self, today):
+        """Whole days left after `today`, matching expiry_cutoff"""
+        return max(0, self.end_ordinal - today.toordinal() - 1)
+
+    def as_dict(self):
+        """Plain dict with formatted dates and days_remaining, e.g. for JSON"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "phone": self.phone,
+            "email": self.email,
+            "membership_type": self.membership_type,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "days_remaining": self.days_remaining,
+            "status": self.status,
+            "branch_id": self.branch_id,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Member):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Member(id={self.id!r}, name={self.name!r}, end_date={self.end_date!r})"
@@ -0,0 +1,226 @@
+import bisect
+import functools
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Calls at least this slow get their statements and query plans recorded
+SLOW_CALL_MS = 100
+SLOW_LOG_SIZE = 50
+RECENT_STATEMENTS = 200
+# Statements kept per call for the slow log (executemany traces every row)
+MAX_STATEMENTS_PER_CALL = 20
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+class Histogram:
+    """Latency histogram over BUCKETS_MS with call and row totals"""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows=None):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if rows:
+            self.rows += rows
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls"""
+        if not self.calls:
+            return 0.0
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "buckets": dict(zip([f"<={bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"], self.counts)),
+        }
+
+def row_count(result):
+    """Rows a Database method returned: list length, 1 for a single record, else None"""
+    if isinstance(result, list):
+        return len(result)
+    if result is None or isinstance(result, (tuple, dict, bool, int, str)):
+        return None
+    return 1
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN for a traced statement as indented lines, or None"""
+    words = sql.split(None, 1)
+    if not words or words[0].upper() not in EXPLAINABLE:
+        return None
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+class Profiler:
+    """Collects Database call latencies, SQL traces and UI phase timings.
+
+    Give one to Database(profiler=...): every method decorated with
+    @profiled is timed into a per-method histogram, each pooled connection
+    gets a trace callback that attributes its statements to the running
+    call, and calls slower than `slow_ms` are logged with their statements
+    and EXPLAIN QUERY PLAN output. UI code records its own phases with
+    `phase()` or `record_phase()`. Everything is kept in memory and is safe
+    to update from several threads.
+    """
+    def __init__(self, slow_ms=SLOW_CALL_MS, enabled=True):
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = datetime.now()
+            self.calls = {}
+            self.phases = {}
+            self.statements = 0
+            self.slow = deque(maxlen=SLOW_LOG_SIZE)
+            self.recent = deque(maxlen=RECENT_STATEMENTS)
+
+    def attach(self, conn):
+        """Trace every statement run on `conn` (ConnectionPool connect hook)"""
+        conn.set_trace_callback(self._trace)
+
+    def _frames(self):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _trace(self, statement):
+        if not self.enabled or getattr(self._local, "explaining", False):
+            return
+        statement = statement.strip()
+        frames = self._frames()
+        with self._lock:
+            self.statements += 1
+            self.recent.append((time.time(), threading.current_thread().name, statement))
+        if frames:
+            statements = frames[-1]
+            # Trigger bodies are reported as repeats of the outer statement
+            if len(statements) < MAX_STATEMENTS_PER_CALL and (not statements or statements[-1] != statement):
+                statements.append(statement)
+
+    def call(self, name, method, db, args, kwargs):
+        """Run a Database method and record its latency, rows and statements"""
+        frames = self._frames()
+        statements = []
+        frames.append(statements)
+        result = None
+        start = time.perf_counter()
+        try:
+            result = method(db, *args, **kwargs)
+            return result
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            frames.pop()
+            rows = row_count(result)
+            with self._lock:
+                self.calls.setdefault(name, Histogram()).add(ms, rows)
+            if ms >= self.slow_ms:
+                self._log_slow(name, ms, rows, statements, db)
+
+    def _log_slow(self, name, ms, rows, statements, db):
+        # The plans are taken on this thread's connection, without tracing them
+        self._local.explaining = True
+        try:
+            conn = db.conn
+            queries = [{"sql": sql, "plan": explain(conn, sql)} for sql in statements]
+        except sqlite3.Error:
+            queries = [{"sql": sql, "plan": None} for sql in statements]
+        finally:
+            self._local.explaining = False
+        with self._lock:
+            self.slow.append({
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "method": name,
+                "ms": round(ms, 3),
+                "rows": rows,
+                "thread": threading.current_thread().name,
+                "queries": queries,
+            })
+
+    def record_phase(self, name, seconds):
+        """Record a UI phase measured by the caller"""
+        if self.enabled:
+            with self._lock:
+                self.phases.setdefault(name, Histogram()).add(seconds * 1000)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body of a with block as a UI phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Everything recorded so far as plain data"""
+        with self._lock:
+            return {
+                "started": self.started.isoformat(timespec="seconds"),
+                "taken": datetime.now().isoformat(timespec="seconds"),
+                "slow_ms": self.slow_ms,
+                "statements": self.statements,
+                "calls": {name: histogram.summary() for name, histogram in sorted(self.calls.items())},
+                "phases": {name: histogram.summary() for name, histogram in sorted(self.phases.items())},
+                "slow": list(self.slow),
+                "recent": [
+                    {"time": datetime.fromtimestamp(when).isoformat(timespec="milliseconds"),
+                     "thread": thread, "sql": sql}
+                    for when, thread, sql in self.recent
+                ],
+            }
+
+    def dump(self, path):
+        """Write the snapshot to a JSON file"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+def profiled(method):
+    """Time a Database method with the database's profiler, if it has one"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None or not profiler.enabled:
+            return method(self, *args, **kwargs)
+        return profiler.call(name, method, self, args, kwargs)
+    return wrapper
@@ -0,0 +1,222 @@
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+# Days-left windows that trigger a reminder (see Database.due_reminders)
+REMINDER_WINDOWS = (7, 3, 1, 0)
+
+# Members who expired up to this many days ago still get their last reminder,
+# so a scheduler that was off for a day or two catches up
+CATCH_UP_DAYS = 3
+
+# Reminders rendered, handed to the outbox and recorded at a time
+BATCH_SIZE = 1000
+
+# sent_reminders rows are kept this many days past the membership end
+KEEP_SENT_DAYS = 60
+
+DEFAULT_OUTBOX_DIR = "outbox"
+DEFAULT_SENDER = "FitGym <no-reply@fitgym.local>"
+
+# (subject, body) per window, formatted with the due_reminders columns and
+# days_left; a window holds every member from its days left down to the
+# next tighter one, e.g. 7 covers 7 to 4 days left
+TEMPLATES = {
+    7: ("Your FitGym membership has {days_left} days left",
+        "Hi {name},\n\nYour {membership_type} membership has {days_left} days left (ends {end_date}). "
+        "Renew at the front desk to keep training without a break.\n\nFitGym"),
+    3: ("Your FitGym membership has {days_left} days left",
+        "Hi {name},\n\nOnly {days_left} days left on your {membership_type} membership (ends {end_date}). "
+        "Renew at the front desk to keep access.\n\nFitGym"),
+    1: ("Your FitGym membership has {days_left} day left",
+        "Hi {name},\n\nYour {membership_type} membership has {days_left} day left (ends {end_date}). "
+        "Renew today to keep access.\n\nFitGym"),
+    0: ("Your FitGym membership has expired",
+        "Hi {name},\n\nYour {membership_type} membership ended on {end_date}. "
+        "We would love to see you back - renew at the front desk any time.\n\nFitGym"),
+}
+
+class Reminder:
+    """One rendered reminder message"""
+    __slots__ = ("member_id", "end_day", "threshold", "name", "to", "phone", "subject", "body")
+
+    def __init__(self, member_id, end_day, threshold, name, to, phone, subject, body):
+        self.member_id = member_id
+        self.end_day = end_day
+        self.threshold = threshold
+        self.name = name
+        self.to = to
+        self.phone = phone
+        self.subject = subject
+        self.body = body
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def render(row, templates=TEMPLATES, today=None):
+    """Build the Reminder for a due_reminders row"""
+    today = today or date.today()
+    # days left = end_day - today - 1 (see database.DAYS_REMAINING_SQL)
+    values = dict(row, days_left=max(0, row["end_day"] - today.toordinal() - 1))
+    subject, body = templates[row["threshold"]]
+    return Reminder(row["id"], row["end_day"], row["threshold"], row["name"], row["email"] or None,
+                    row["phone"], subject.format(**values), body.format(**values))
+
+class FileOutbox:
+    """Appends reminders to one JSON Lines file per day; a local stand-in for mail.
+
+    Members without an email address are written too, so the front desk can
+    phone them.
+    """
+    def __init__(self, directory=DEFAULT_OUTBOX_DIR):
+        self.directory = directory
+
+    def send(self, reminders):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"reminders-{date.today():%Y%m%d}.jsonl")
+        queued = datetime.now().isoformat(timespec="seconds")
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(dict(reminder.as_dict(), queued=queued)) + "\n" for reminder in reminders)
+        return len(reminders)
+
+class SmtpOutbox:
+    """Sends reminders through an SMTP server, one connection per batch.
+
+    Members without an email address are skipped. Point it at a local debug
+    server (e.g. `python -m aiosmtpd -n -l localhost:8025`) to try it out.
+    """
+    def __init__(self, host="localhost", port=25, sender=DEFAULT_SENDER,
+                 username=None, password=None, starttls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, reminders):
+        # Imported here: smtplib would add noticeably to the app's startup
+        import smtplib
+        from email.message import EmailMessage
+
+        sent = 0
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for reminder in reminders:
+                if not reminder.to:
+                    continue
+                message = EmailMessage()
+                message["From"] = self.sender
+                message["To"] = reminder.to
+                message["Subject"] = reminder.subject
+                message.set_content(reminder.body)
+                smtp.send_message(message)
+                sent += 1
+        return sent
+
+class ReminderResult:
+    """Outcome of a reminder run: reminders due and how many the outbox delivered"""
+    def __init__(self, due=0):
+        self.due = due
+        self.delivered = 0
+        self.batches = 0
+
+    def __str__(self):
+        return f"{self.due} reminders due, {self.delivered} delivered in {self.batches} batches"
+
+class ReminderScheduler:
+    """Sends expiry reminders as members enter the 7, 3, 1 and 0 days-left windows.
+
+    Each run finds the due members with one indexed range query over
+    end_day (Database.due_reminders), renders them BATCH_SIZE at a time and
+    hands each batch to `outbox`: any object whose send(reminders) delivers
+    them and returns the number delivered. Each reminder is claimed in
+    sent_reminders before it is sent and only the ones this run claimed go
+    out, so terminals running at the same time never send the same one.
+    If a send fails the batch's claims are dropped and the run stops; the
+    batch is sent again next time, so part of a batch an outbox had
+    delivered before failing can arrive twice. With several databases
+    sharing synced members (sync.py), give each one its `branch_id` so
+    every member is reminded by one branch only.
+    """
+    LAST_RUN_KEY = "last_reminder_run"
+
+    def __init__(self, db, outbox, windows=REMINDER_WINDOWS, batch_size=BATCH_SIZE, branch_id=None):
+        self.db = db
+        self.outbox = outbox
+        self.windows = windows
+        self.batch_size = batch_size
+        self.branch_id = branch_id
+
+    def last_run(self):
+        """Return the date (YYYY-MM-DD) of the last completed run, if any"""
+        return self.db.get_meta(self.LAST_RUN_KEY)
+
+    def is_due(self, today=None):
+        """Reminders go out once per calendar day"""
+        today = today or date.today()
+        return self.last_run() != today.strftime("%Y-%m-%d")
+
+    def run(self, force=False, today=None):
+        """Send the reminders that are due and return a ReminderResult"""
+        today = today or date.today()
+        if not force and not self.is_due(today):
+            return ReminderResult()
+
+        rows = self.db.due_reminders(self.windows, today, CATCH_UP_DAYS, self.branch_id)
+        result = ReminderResult(len(rows))
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            success, claimed = self.db.record_reminders(
+                [(row["id"], row["end_day"], row["threshold"]) for row in chunk]
+            )
+            if not success:
+                raise sqlite3.DatabaseError(f"Could not record reminders: {claimed}")
+            claimed = set(claimed)
+            batch = [render(row, today=today) for row in chunk
+                     if (row["id"], row["end_day"], row["threshold"]) in claimed]
+            if not batch:
+                continue
+            try:
+                result.delivered += self.outbox.send(batch)
+            except Exception:
+                self.db.forget_reminders(list(claimed))
+                raise
+            result.batches += 1
+
+        self.db.record_reminders([], keep_days=KEEP_SENT_DAYS, today=today)
+        self.db.set_meta(self.LAST_RUN_KEY, today.strftime("%Y-%m-%d"))
+        return result
+
+if __name__ == "__main__":
+    # Allow reminders to be sent from cron / Task Scheduler
+    import argparse
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Send membership expiry reminders")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--outbox", default=DEFAULT_OUTBOX_DIR, help="directory for the file outbox")
+    parser.add_argument("--smtp", metavar="HOST[:PORT]", help="send through this SMTP server instead")
+    parser.add_argument("--sender", default=DEFAULT_SENDER)
+    parser.add_argument("--branch", type=int, help="only members of this branch id")
+    parser.add_argument("--force", action="store_true", help="run even if reminders went out today")
+    args = parser.parse_args()
+
+    if args.smtp:
+        host, _, port = args.smtp.partition(":")
+        outbox = SmtpOutbox(host, int(port or 25), args.sender)
+    else:
+        outbox = FileOutbox(args.outbox)
+
+    db = Database(args.db)
+    try:
+        print(ReminderScheduler(db, outbox, branch_id=args.branch).run(force=args.force))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Reminder run failed: {e}")
+    finally:
+        db.close()
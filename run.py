@@ -1,8 +1,11 @@
+import time
+
+# Taken first so the startup report covers imports too
+STARTED = time.perf_counter()
+
+import importlib.util
 import os
 import sys
-import subprocess
-import tkinter as tk
-from tkinter import messagebox
 
 def check_dependencies():
     """Check if required dependencies are installed"""
@@ -10,15 +13,15 @@ def check_dependencies():
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        # find_spec locates the package without importing it
+        if importlib.util.find_spec(package) is None:
             missing_packages.append(package)
     
     return missing_packages
 
 def install_dependencies(packages):
     """Install missing dependencies"""
+    import subprocess
     try:
         subprocess.check_call([sys.executable, "-m", "pip", "install"] + packages)
         return True
@@ -27,6 +30,10 @@ def install_dependencies(packages):
 
 def main():
     """Main entry point"""
+    # Imported here so the headless server runs without Tk installed
+    import tkinter as tk
+    from tkinter import messagebox
+    
     # Check dependencies
     missing_packages = check_dependencies()
     
@@ -62,10 +69,25 @@ def main():
     try:
         from main import FitGymApp
         root = tk.Tk()
-        app = FitGymApp(root)
+        app = FitGymApp(root, STARTED)
         root.mainloop()
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
+def run_server(args):
+    """Run the headless JSON API (server.py) instead of the GUI"""
+    import argparse
+    from server import serve, DEFAULT_HOST, DEFAULT_PORT
+    
+    parser = argparse.ArgumentParser(prog="run.py --serve", description="FitGym JSON API server")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    options = parser.parse_args(args)
+    serve(options.db, options.host, options.port)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--serve" in sys.argv[1:]:
+        run_server([arg for arg in sys.argv[1:] if arg != "--serve"])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,409 @@
+import asyncio
+import json
+import re
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+
+from async_database import AsyncDatabase
+from database import DAYS_FILTERS, MEMBER_SORTS
+from validation import validate_member
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Database calls run on this many threads, each with its own connection
+DB_THREADS = 8
+# A request whose database work takes longer than this gets 503
+DB_TIMEOUT_SECONDS = 10
+# Clients beyond this many open connections get 503 straight away
+MAX_CONNECTIONS = 256
+MAX_BODY_BYTES = 64 * 1024
+MAX_PAGE_SIZE = 500
+KEEP_ALIVE_SECONDS = 15
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+class HttpError(Exception):
+    """Turned into a JSON error response"""
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+class Request:
+    """A parsed HTTP request"""
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip("/") or "/"
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HttpError(400, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+class ApiServer:
+    """JSON over HTTP/1.1 for kiosks, turnstiles and the website.
+
+    Requests are parsed on the asyncio loop and every Database call goes
+    through an AsyncDatabase with DB_THREADS threads, which bounds the number
+    of SQLite connections; slow reads are aborted after DB_TIMEOUT_SECONDS. Member GETs carry an ETag built from the members change
+    counter and the date, so unchanged lists and records answer
+    If-None-Match with 304 without running the query.
+    """
+    def __init__(self, db_file="fitgym.db", host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 db_threads=DB_THREADS, max_connections=MAX_CONNECTIONS):
+        self.db = AsyncDatabase(db_file, max_workers=db_threads, timeout=DB_TIMEOUT_SECONDS)
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self._open_connections = 0
+        self._server = None
+
+        # (method, path pattern, handler, conditional GET)
+        self.routes = [
+            ("GET", r"/members", self.list_members, True),
+            ("POST", r"/members", self.add_member, False),
+            ("GET", r"/members/(\d+)", self.get_member, True),
+            ("PUT", r"/members/(\d+)", self.update_member, False),
+            ("DELETE", r"/members/(\d+)", self.delete_member, False),
+            ("POST", r"/members/(\d+)/check-in", self.check_in, False),
+            ("GET", r"/search", self.search, True),
+            ("GET", r"/membership-types", self.membership_types, True),
+            ("GET", r"/stats", self.stats, True),
+            ("GET", r"/branches", self.branches, False),
+        ]
+        self.routes = [
+            (method, re.compile(pattern + "$"), handler, conditional)
+            for method, pattern, handler, conditional in self.routes
+        ]
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"FitGym API listening on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server:
+            self._server.close()
+        self.db.close()
+
+    # Connection handling
+
+    async def _handle_connection(self, reader, writer):
+        if self._open_connections >= self.max_connections:
+            await self._send(writer, 503, {"error": "Server busy"}, keep_alive=False)
+            writer.close()
+            return
+
+        self._open_connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_SECONDS)
+                except HttpError as e:
+                    await self._send(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                status, payload, headers = await self._dispatch(request)
+                keep_alive = request.keep_alive()
+                await self._send(writer, status, payload, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._open_connections -= 1
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Read one request, or return None when the client closed the connection"""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "Request headers too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+
+    async def _dispatch(self, request):
+        """Route a request and return (status, payload, headers)"""
+        allowed = []
+        for method, pattern, handler, conditional in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+
+            try:
+                etag = None
+                if conditional:
+                    # days_remaining depends on the date as well as the data
+                    version = await self.db.members_version()
+                    if version is not None:
+                        etag = f'"{version}-{date.today().toordinal()}"'
+                        if request.headers.get("if-none-match") == etag:
+                            return 304, None, {"ETag": etag}
+
+                status, payload = await handler(request, *match.groups())
+                headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+                return status, payload, headers
+            except HttpError as e:
+                payload = {"error": e.message}
+                if e.details:
+                    payload["details"] = e.details
+                return e.status, payload, {}
+            except asyncio.TimeoutError:
+                return 503, {"error": "Database busy, try again"}, {"Retry-After": "1"}
+            except Exception as e:
+                print(f"API error on {request.method} {request.path}: {e}")
+                return 500, {"error": "Internal server error"}, {}
+
+        if allowed:
+            return 405, {"error": "Method not allowed"}, {"Allow": ", ".join(allowed)}
+        return 404, {"error": "Not found"}, {}
+
+    async def _send(self, writer, status, payload, headers=None, keep_alive=True):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    # Handlers: each returns (status, JSON payload)
+
+    async def list_members(self, request):
+        """GET /members?filter=&search=&sort=&limit=&branch=&after=<id>|before=<id>|offset="""
+        filter = _choice(request, "filter", DAYS_FILTERS)
+        sort = _choice(request, "sort", MEMBER_SORTS) or "expiry"
+        search = request.query.get("search") or None
+        limit = _int(request, "limit", 100, 1, MAX_PAGE_SIZE)
+        offset = _int(request, "offset", None, 0)
+        after = _int(request, "after", None)
+        before = _int(request, "before", None)
+        branch_id = _int(request, "branch", None)
+
+        def fetch(db):
+            position = {}
+            for name, anchor_id in (("after", after), ("before", before)):
+                if anchor_id is not None:
+                    anchor = db.get_member(anchor_id)
+                    if anchor is None:
+                        raise HttpError(400, f"Member {anchor_id} given as '{name}' does not exist")
+                    position[name] = anchor
+            if offset is not None:
+                position["offset"] = offset
+            members = db.query_members(filter, search, sort, limit, branch_id=branch_id, **position)
+            return db.count_members(filter, search, branch_id), members
+
+        total, members = await self.db.run(fetch, interruptible=True)
+        return 200, {
+            "total": total,
+            "members": [member.as_dict() for member in members],
+            "next_after": members[-1].id if len(members) == limit else None,
+        }
+
+    async def get_member(self, request, member_id):
+        member = await self.db.get_member(int(member_id))
+        if member is None:
+            raise HttpError(404, "Member not found")
+        return 200, member.as_dict()
+
+    async def add_member(self, request):
+        data = request.json()
+        fields = {name: _text(data.get(name)) for name in ("name", "phone", "email", "membership_type")}
+        errors = validate_member(**fields)
+        if errors:
+            raise HttpError(400, "Invalid member", errors)
+
+        success, result = await self.db.add_member(**fields)
+        if not success:
+            raise HttpError(400, result)
+        member = await self.db.get_member(result)
+        return 201, member.as_dict()
+
+    async def update_member(self, request, member_id):
+        """PUT /members/<id>; omitted fields keep their current values.
+
+        Giving start_date or end_date sets the dates directly, otherwise a
+        new membership_type restarts the membership; extend_days adds days.
+        """
+        member_id = int(member_id)
+        data = request.json()
+        member = await self.db.get_member(member_id)
+        if member is None:
+            raise HttpError(404, "Member not found")
+
+        fields = {
+            name: _text(data[name]) if data.get(name) is not None else getattr(member, name)
+            for name in ("name", "phone", "email", "membership_type", "start_date", "end_date")
+        }
+        set_dates = "start_date" in data or "end_date" in data
+        try:
+            extend_days = int(data.get("extend_days", 0))
+        except (TypeError, ValueError):
+            raise HttpError(400, "extend_days must be a number")
+        if extend_days < 0:
+            raise HttpError(400, "Extension days cannot be negative")
+
+        errors = validate_member(**fields, check_dates=set_dates)
+        if errors:
+            raise HttpError(400, "Invalid member", errors)
+
+        if set_dates:
+            success, message = await self.db.update_member_dates(member_id, **fields, extend_days=extend_days)
+        else:
+            del fields["start_date"], fields["end_date"]
+            success, message = await self.db.update_member(member_id, **fields, extend_days=extend_days)
+        if not success:
+            raise HttpError(404 if message == "Member not found" else 400, message)
+
+        member = await self.db.get_member(member_id)
+        return 200, member.as_dict()
+
+    async def delete_member(self, request, member_id):
+        success, message = await self.db.delete_member(int(member_id))
+        if not success:
+            raise HttpError(404 if message == "Member not found" else 400, message)
+        return 204, None
+
+    async def check_in(self, request, member_id):
+        data = request.json()
+        success, message = await self.db.check_in(int(member_id), data.get("door"))
+        if not success:
+            raise HttpError(404 if message == "Member not found" else 403, message)
+        return 200, {"member_id": int(member_id), "message": message}
+
+    async def search(self, request):
+        """GET /search?q=&limit= : best matches first"""
+        term = request.query.get("q", "").strip()
+        if not term:
+            raise HttpError(400, "Missing search term 'q'")
+        limit = _int(request, "limit", 10, 1, 50)
+        members = await self.db.search_top(term, limit)
+        return 200, {"members": [member.as_dict() for member in members]}
+
+    async def membership_types(self, request):
+        return 200, {"membership_types": await self.db.get_membership_types()}
+
+    async def stats(self, request):
+        """GET /stats?branch=<id>"""
+        stats = await self.db.get_dashboard_stats(None, _int(request, "branch", None))
+        if stats is None:
+            raise HttpError(500, "Could not read statistics")
+        return 200, stats
+
+    async def branches(self, request):
+        return 200, {"branches": await self.db.get_branches()}
+
+def _choice(request, name, choices):
+    value = request.query.get(name) or None
+    if value is not None and value not in choices:
+        raise HttpError(400, f"'{name}' must be one of: {', '.join(choices)}")
+    return value
+
+def _text(value):
+    """A member field from a JSON body, stripped; None when missing or blank,
+    which is how the importer stores empty optional fields"""
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+def _int(request, name, default, minimum=None, maximum=None):
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HttpError(400, f"'{name}' must be a number")
+    if minimum is not None and value < minimum:
+        raise HttpError(400, f"'{name}' must be at least {minimum}")
+    return min(value, maximum) if maximum is not None else value
+
+def serve(db_file="fitgym.db", host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the API server until interrupted"""
+    server = ApiServer(db_file, host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FitGym JSON API server")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    serve(args.db, args.host, args.port)
@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import uuid
+
+from database import Database, SYNC_COLUMNS, status_for_end_date
+
+ENTRY_COLUMNS = "origin, seq, clock, uid, op, " + SYNC_COLUMNS
+SEEDED_KEY = "sync_seeded"
+
+def encode_changes(entries):
+    """Serialize change_log entries for sending to another replica"""
+    return json.dumps({"columns": ENTRY_COLUMNS.split(", "), "entries": entries},
+                      separators=(",", ":")).encode("utf-8")
+
+class SyncResult:
+    """Outcome of a sync: entries sent each way, how many changed members, bytes moved"""
+    def __init__(self):
+        self.pulled = 0
+        self.pushed = 0
+        self.applied_here = 0
+        self.applied_there = 0
+        self.bytes = 0
+
+    def __str__(self):
+        return (f"Pulled {self.pulled} changes ({self.applied_here} applied), "
+                f"pushed {self.pushed} ({self.applied_there} applied), {self.bytes / 1024:.1f} KB")
+
+class SyncEngine:
+    """Replicates members between databases by exchanging change_log deltas.
+
+    Database logs every member write with its origin id, a per-origin seq
+    and a Lamport clock (see Database._log_changes). Replicas compare
+    version vectors (the highest seq seen per origin) and send only the
+    entries the other side lacks, so a sync moves the changes since the last
+    one rather than the database. Entries are kept after applying, which
+    lets a central replica relay one branch's changes to the others.
+
+    Conflicts are settled per member by last writer wins: the entry with the
+    highest (clock, origin) decides the member's state on every replica,
+    whatever order the entries arrive in. Members are matched by uid; ids,
+    status (derived from end_date), the membership ledger and visits stay
+    local to each database.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def origin(self):
+        return self.db.sync_origin()
+
+    def vector(self):
+        """Highest seq held for each origin"""
+        return dict(self.db.conn.execute("SELECT origin, seq FROM sync_vector").fetchall())
+
+    def changes_since(self, vector):
+        """Entries a replica with the given version vector has not seen, oldest first per origin"""
+        conn = self.db.conn
+        entries = []
+        for origin, seq in self.vector().items():
+            seen = vector.get(origin, 0)
+            if seq > seen:
+                entries.extend(conn.execute(
+                    f"SELECT {ENTRY_COLUMNS} FROM change_log WHERE origin = ? AND seq > ? ORDER BY seq",
+                    (origin, seen)
+                ).fetchall())
+        return entries
+
+    def apply(self, entries):
+        """Store entries from another replica and apply the ones that win.
+
+        Runs in one transaction and returns the number of member changes
+        applied. Entries already held are skipped, so a repeated or
+        interrupted sync is harmless.
+        """
+        conn = self.db.conn
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in ENTRY_COLUMNS.split(", "))
+        applied = 0
+        try:
+            for entry in entries:
+                origin, seq, clock, uid, op = entry[:5]
+                cursor.execute(f"INSERT OR IGNORE INTO change_log ({ENTRY_COLUMNS}) VALUES ({placeholders})", entry)
+                if cursor.rowcount == 0:
+                    continue
+                cursor.execute(
+                    "SELECT origin, seq FROM change_log WHERE uid = ? ORDER BY clock DESC, origin DESC LIMIT 1",
+                    (uid,)
+                )
+                if cursor.fetchone() != (origin, seq):
+                    continue  # We already hold a later write to this member
+                if op == "delete":
+                    cursor.execute("DELETE FROM members WHERE uid = ?", (uid,))
+                else:
+                    self._upsert_member(cursor, entry)
+                applied += 1
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            self.db.invalidate_cache()
+        return applied
+
+    def _upsert_member(self, cursor, entry):
+        values = dict(zip(ENTRY_COLUMNS.split(", "), entry))
+        columns = SYNC_COLUMNS.split(", ")
+        cursor.execute(f'''
+            INSERT INTO members (uid, {SYNC_COLUMNS}, status)
+            VALUES (:uid, {", ".join(":" + column for column in columns)}, :status)
+            ON CONFLICT (uid) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in columns)},
+                status = excluded.status
+        ''', dict(values, status=status_for_end_date(values["end_date"])))
+
+    def seed(self):
+        """Log the members written before the change log existed, once"""
+        if self.db.get_meta(SEEDED_KEY):
+            return 0
+        success, result = self.db.seed_change_log()
+        if not success:
+            raise sqlite3.DatabaseError(result)
+        self.db.set_meta(SEEDED_KEY, "1")
+        return result
+
+    def sync(self, other):
+        """Exchange changes with another replica (e.g. the central database)"""
+        if self.origin == other.origin:
+            raise ValueError(
+                "Both databases have the same origin id (one is a copy of the other); "
+                "give the copy a new one with reset_origin()"
+            )
+        self.seed()
+        other.seed()
+
+        result = SyncResult()
+        here, there = self.vector(), other.vector()
+        pulled = other.changes_since(here)
+        pushed = self.changes_since(there)
+        # What would cross the network: both vectors and both change sets
+        result.bytes = (len(json.dumps(here)) + len(json.dumps(there))
+                        + len(encode_changes(pulled)) + len(encode_changes(pushed)))
+        result.pulled, result.pushed = len(pulled), len(pushed)
+        result.applied_here = self.apply(pulled)
+        result.applied_there = other.apply(pushed)
+        return result
+
+    def reset_origin(self):
+        """Give this database a new origin id; needed after copying a database file"""
+        self.db.set_meta("sync_origin", uuid.uuid4().hex[:16])
+
+    def compact(self):
+        """Delete entries superseded by a later write to the same member.
+
+        A replica that never saw a superseded entry does not need it, since
+        the later entry decides the member either way. Returns the number of
+        entries deleted.
+        """
+        conn = self.db.conn
+        try:
+            cursor = conn.execute('''
+                DELETE FROM change_log WHERE EXISTS (
+                    SELECT 1 FROM change_log later
+                    WHERE later.uid = change_log.uid
+                      AND (later.clock > change_log.clock
+                           OR (later.clock = change_log.clock AND later.origin > change_log.origin))
+                )
+            ''')
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync members with a central database")
+    parser.add_argument("central", help="central database file")
+    parser.add_argument("--db", default="fitgym.db")
+    parser.add_argument("--new-origin", action="store_true",
+                        help="give --db a new origin id first (after copying a database file)")
+    parser.add_argument("--compact", action="store_true", help="drop superseded log entries afterwards")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    central = Database(args.central)
+    try:
+        engine = SyncEngine(db)
+        if args.new_origin:
+            engine.reset_origin()
+        print(engine.sync(SyncEngine(central)))
+        if args.compact:
+            print(f"Compacted {engine.compact()} log entries")
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Sync failed: {e}")
+    finally:
+        db.close()
+        central.close()
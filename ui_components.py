@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import ttkthemes as ttkth
-from datetime import datetime
-import re
+from collections import OrderedDict
+import bisect
+
+from validation import validate_member
 
 # Custom colors
 # Update the color scheme with more vibrant colors
@@ -22,12 +23,21 @@ class ModernButton(ttk.Button):
         ttk.Button.__init__(self, parent, **kwargs)
 
 class SearchBox(ttk.Frame):
-    """Custom search box with icon"""
-    def __init__(self, parent, command=None, placeholder="Search...", **kwargs):
+    """Custom search box with icon
+    
+    With `live=True` the command also runs while typing, once no key has
+    been pressed for `delay_ms`; `on_clear` runs when the box is emptied.
+    """
+    def __init__(self, parent, command=None, placeholder="Search...", live=False, delay_ms=250, on_clear=None, **kwargs):
         ttk.Frame.__init__(self, parent, **kwargs)
         
         self.command = command
         self.placeholder = placeholder
+        self.live = live
+        self.delay_ms = delay_ms
+        self.on_clear = on_clear
+        self._pending_search = None
+        self._last_text = ""
         
         # Search entry
         self.search_var = tk.StringVar()
@@ -55,13 +65,31 @@ class SearchBox(ttk.Frame):
             self.search_entry.insert(0, self.placeholder)
     
     def _on_search_change(self, *args):
-        # Auto-search as user types (optional)
-        pass
+        # Auto-search as user types, debounced so a burst of keys runs one search
+        if not self.live:
+            return
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+        self._pending_search = self.after(self.delay_ms, self._run_search, False)
     
     def _on_search(self, event=None):
-        search_text = self.search_var.get()
-        if search_text and search_text != self.placeholder and self.command:
+        self._run_search(force=True)
+    
+    def _run_search(self, force):
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+            self._pending_search = None
+        
+        # Typing pauses only search when the text actually changed
+        search_text = self.get().strip()
+        if search_text == self._last_text and not force:
+            return
+        self._last_text = search_text
+        
+        if search_text and self.command:
             self.command(search_text)
+        elif not search_text and self.on_clear:
+            self.on_clear()
     
     def get(self):
         text = self.search_var.get()
@@ -152,61 +180,28 @@ class MemberForm(ttk.Frame):
         if not self.member_data:
             return
         
-        self.name_var.set(self.member_data['name'])
-        self.phone_var.set(self.member_data['phone'] or "")
-        self.email_var.set(self.member_data['email'] or "")
-        self.membership_var.set(self.member_data['membership_type'])
+        self.name_var.set(self.member_data.name)
+        self.phone_var.set(self.member_data.phone or "")
+        self.email_var.set(self.member_data.email or "")
+        self.membership_var.set(self.member_data.membership_type)
         
         # Set start and end dates if allow_edit_all is True
         if self.allow_edit_all:
-            self.start_date_var.set(self.member_data['start_date'])
-            self.end_date_var.set(self.member_data['end_date'])
+            self.start_date_var.set(self.member_data.start_date)
+            self.end_date_var.set(self.member_data.end_date)
     
     def _validate_form(self):
         """Validate form inputs"""
-        errors = []
-        
-        # Name validation
-        name = self.name_var.get().strip()
-        if not name:
-            errors.append("Name is required")
-        
-        # Email validation (if provided)
-        email = self.email_var.get().strip()
-        if email and not re.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", email):
-            errors.append("Invalid email format")
-        
-        # Phone validation (basic)
-        phone = self.phone_var.get().strip()
-        if phone and not re.match(r"^[0-9+\-() ]+$", phone):
-            errors.append("Phone number should contain only digits, +, -, (, ) and spaces")
-        
-        # Membership type validation
-        membership_type = self.membership_var.get()
-        if not membership_type:
-            errors.append("Please select a membership type")
-        
-        # Date validation (if editing all fields)
-        if self.is_edit_mode and self.allow_edit_all:
-            # Validate start date format
-            start_date = self.start_date_var.get().strip()
-            if not re.match(r"^\d{4}-\d{2}-\d{2}$", start_date):
-                errors.append("Start date must be in YYYY-MM-DD format")
-            
-            # Validate end date format
-            end_date = self.end_date_var.get().strip()
-            if not re.match(r"^\d{4}-\d{2}-\d{2}$", end_date):
-                errors.append("End date must be in YYYY-MM-DD format")
-            
-            # Validate that end date is after start date
-            try:
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                end = datetime.strptime(end_date, "%Y-%m-%d")
-                if end < start:
-                    errors.append("End date must be after start date")
-            except ValueError:
-                # Date format errors already caught above
-                pass
+        check_dates = self.is_edit_mode and self.allow_edit_all
+        errors = validate_member(
+            self.name_var.get().strip(),
+            self.phone_var.get().strip(),
+            self.email_var.get().strip(),
+            self.membership_var.get(),
+            self.start_date_var.get().strip() if check_dates else None,
+            self.end_date_var.get().strip() if check_dates else None,
+            check_dates=check_dates
+        )
         
         # Extension validation (edit mode only)
         if self.is_edit_mode:
@@ -236,7 +231,7 @@ class MemberForm(ttk.Frame):
         
         # Add member ID and extension days for edit mode
         if self.is_edit_mode:
-            data["id"] = self.member_data["id"]
+            data["id"] = self.member_data.id
             data["extend_days"] = int(self.extend_var.get())
             
             # Add start and end dates if editing all fields
@@ -266,27 +261,27 @@ class MemberDetailsView(ttk.Frame):
         
         # Member info
         ttk.Label(self, text="Name:", font=("Helvetica", 10, "bold")).grid(row=1, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['name']).grid(row=1, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.name).grid(row=1, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="Phone:", font=("Helvetica", 10, "bold")).grid(row=2, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['phone'] or "-").grid(row=2, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.phone or "-").grid(row=2, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="Email:", font=("Helvetica", 10, "bold")).grid(row=3, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['email'] or "-").grid(row=3, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.email or "-").grid(row=3, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="Membership:", font=("Helvetica", 10, "bold")).grid(row=4, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['membership_type']).grid(row=4, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.membership_type).grid(row=4, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="Start Date:", font=("Helvetica", 10, "bold")).grid(row=5, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['start_date']).grid(row=5, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.start_date).grid(row=5, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="End Date:", font=("Helvetica", 10, "bold")).grid(row=6, column=0, sticky="w", pady=2)
-        ttk.Label(self, text=self.member_data['end_date']).grid(row=6, column=1, sticky="w", pady=2)
+        ttk.Label(self, text=self.member_data.end_date).grid(row=6, column=1, sticky="w", pady=2)
         
         ttk.Label(self, text="Days Remaining:", font=("Helvetica", 10, "bold")).grid(row=7, column=0, sticky="w", pady=2)
         
         # Style days remaining based on value
-        days = self.member_data.get('days_remaining', 0)
+        days = self.member_data.days_remaining
         days_label = ttk.Label(self, text=str(days))
         days_label.grid(row=7, column=1, sticky="w", pady=2)
         
@@ -301,7 +296,7 @@ class MemberDetailsView(ttk.Frame):
             days_label.configure(foreground="#f2ff00")  # Yellow for 3 days
         
         ttk.Label(self, text="Status:", font=("Helvetica", 10, "bold")).grid(row=8, column=0, sticky="w", pady=2)
-        status_text = self.member_data['status'].capitalize()
+        status_text = self.member_data.status.capitalize()
         status_label = ttk.Label(self, text=status_text)
         status_label.grid(row=8, column=1, sticky="w", pady=2)
         
@@ -330,10 +325,10 @@ class MemberDetailsView(ttk.Frame):
         if self.on_delete:
             confirm = messagebox.askyesno(
                 "Confirm Deletion", 
-                f"Are you sure you want to delete {self.member_data['name']}?"
+                f"Are you sure you want to delete {self.member_data.name}?"
             )
             if confirm:
-                self.on_delete(self.member_data['id'])
+                self.on_delete(self.member_data.id)
                 self.master.destroy()
 
 class StatusBar(ttk.Frame):
@@ -345,7 +340,488 @@ class StatusBar(ttk.Frame):
         self.status_label = ttk.Label(self, textvariable=self.status_var, anchor=tk.W)
         self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
+        # Indeterminate progress bar shown while database calls are running
+        self.progress = ttk.Progressbar(self, mode="indeterminate", length=100)
+        
         self.set_status("Ready")
     
     def set_status(self, text):
-        self.status_var.set(text)
\ No newline at end of file
+        self.status_var.set(text)
+    
+    def set_busy(self, busy):
+        """Show or hide the loading indicator"""
+        if busy:
+            self.progress.pack(side=tk.RIGHT, padx=5)
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+
+class DashboardPanel(ttk.Frame):
+    """Row of live membership figures (see Database.get_dashboard_stats)"""
+    def __init__(self, parent, **kwargs):
+        ttk.Frame.__init__(self, parent, **kwargs)
+
+        self.tiles = {}
+        self.plans_var = tk.StringVar()
+
+        for key, caption in (
+            ("active", "Active"),
+            ("expired", "Expired"),
+            (1, "Expiring in 1 day"),
+            (3, "in 3 days"),
+            (7, "in 7 days"),
+            (30, "in 30 days"),
+            ("new_this_week", "New this week"),
+        ):
+            tile = ttk.Frame(self)
+            tile.pack(side=tk.LEFT, padx=(0, 20))
+            value_var = tk.StringVar(value="-")
+            ttk.Label(tile, textvariable=value_var, font=("Helvetica", 16, "bold")).pack(anchor=tk.W)
+            ttk.Label(tile, text=caption, foreground=LIGHT_TEXT_COLOR).pack(anchor=tk.W)
+            self.tiles[key] = value_var
+
+        ttk.Label(self, textvariable=self.plans_var, foreground=LIGHT_TEXT_COLOR).pack(side=tk.RIGHT)
+
+    def update_stats(self, stats):
+        """Show a stats dict; None (a failed read) leaves the old figures"""
+        if not stats:
+            return
+        for key, value_var in self.tiles.items():
+            value = stats["expiring"][key] if isinstance(key, int) else stats[key]
+            value_var.set(str(value))
+        self.plans_var.set("  ".join(f"{plan}: {count}" for plan, count in sorted(stats["by_plan"].items())))
+
+class DiagnosticsView(ttk.Frame):
+    """Latency tables, slow calls with query plans and recent SQL from a Profiler"""
+    TIMING_COLUMNS = (
+        ("name", "Name", 220), ("calls", "Calls", 60), ("mean_ms", "Mean ms", 80),
+        ("p50_ms", "p50 ms", 80), ("p95_ms", "p95 ms", 80), ("max_ms", "Max ms", 80), ("rows", "Rows", 80)
+    )
+    
+    def __init__(self, parent, profiler, on_save=None, **kwargs):
+        ttk.Frame.__init__(self, parent, **kwargs)
+        
+        self.profiler = profiler
+        self.slow_entries = []
+        
+        self.summary_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.summary_var).pack(fill=tk.X, pady=(0, 5))
+        
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        
+        self.calls_tree = self._timing_tree(notebook)
+        notebook.add(self.calls_tree.master, text="Database calls")
+        self.phases_tree = self._timing_tree(notebook)
+        notebook.add(self.phases_tree.master, text="UI phases")
+        
+        # Slow calls: list on top, statements and plans of the selected one below
+        slow_frame = ttk.Frame(notebook)
+        self.slow_tree = ttk.Treeview(
+            slow_frame, columns=("time", "method", "ms", "rows"), show="headings", height=8, selectmode="browse"
+        )
+        for column, heading, width in (("time", "Time", 160), ("method", "Method", 200), ("ms", "ms", 100), ("rows", "Rows", 80)):
+            self.slow_tree.heading(column, text=heading)
+            self.slow_tree.column(column, width=width)
+        self.slow_tree.pack(fill=tk.X)
+        self.slow_tree.bind("<<TreeviewSelect>>", self._show_slow_entry)
+        self.plan_text = tk.Text(slow_frame, height=12, wrap=tk.WORD, font=("Courier", 9))
+        self.plan_text.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        notebook.add(slow_frame, text="Slow calls")
+        
+        self.recent_text = tk.Text(notebook, wrap=tk.NONE, font=("Courier", 9))
+        notebook.add(self.recent_text, text="Recent SQL")
+        
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ModernButton(button_frame, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=(0, 5))
+        ModernButton(button_frame, text="Reset", command=self._reset).pack(side=tk.LEFT, padx=5)
+        if on_save:
+            ModernButton(button_frame, text="Save Report...", command=on_save).pack(side=tk.RIGHT)
+        
+        self.refresh()
+    
+    def _timing_tree(self, parent):
+        frame = ttk.Frame(parent)
+        tree = ttk.Treeview(frame, columns=[column for column, _, _ in self.TIMING_COLUMNS], show="headings")
+        for column, heading, width in self.TIMING_COLUMNS:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column == "name" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True)
+        return tree
+    
+    def refresh(self):
+        """Show the profiler's current figures"""
+        snapshot = self.profiler.snapshot()
+        self.summary_var.set(
+            f"Since {snapshot['started']}: {snapshot['statements']} SQL statements, "
+            f"calls over {snapshot['slow_ms']} ms are logged as slow"
+        )
+        
+        for tree, timings in ((self.calls_tree, snapshot["calls"]), (self.phases_tree, snapshot["phases"])):
+            tree.delete(*tree.get_children())
+            # Slowest overall first
+            for name, summary in sorted(timings.items(), key=lambda item: -item[1]["mean_ms"] * item[1]["calls"]):
+                tree.insert("", tk.END, values=[name] + [summary[column] for column, _, _ in self.TIMING_COLUMNS[1:]])
+        
+        self.slow_entries = list(reversed(snapshot["slow"]))
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for index, entry in enumerate(self.slow_entries):
+            rows = "" if entry["rows"] is None else entry["rows"]
+            self.slow_tree.insert("", tk.END, iid=str(index), values=(entry["time"], entry["method"], entry["ms"], rows))
+        self.plan_text.delete("1.0", tk.END)
+        
+        self.recent_text.delete("1.0", tk.END)
+        for statement in reversed(snapshot["recent"]):
+            self.recent_text.insert(tk.END, f"{statement['time']}  [{statement['thread']}]  {' '.join(statement['sql'].split())}\n")
+    
+    def _show_slow_entry(self, event=None):
+        selection = self.slow_tree.selection()
+        if not selection:
+            return
+        entry = self.slow_entries[int(selection[0])]
+        self.plan_text.delete("1.0", tk.END)
+        if not entry["queries"]:
+            self.plan_text.insert(tk.END, "No SQL was traced for this call.\n")
+        for query in entry["queries"]:
+            self.plan_text.insert(tk.END, " ".join(query["sql"].split()) + "\n")
+            for line in query["plan"] or []:
+                self.plan_text.insert(tk.END, "    " + line + "\n")
+            self.plan_text.insert(tk.END, "\n")
+    
+    def _reset(self):
+        self.profiler.reset()
+        self.refresh()
+
+class ListSource:
+    """Row source for VirtualTreeview backed by an in-memory list.
+    
+    `rows` must already be ordered by `key`, which lets apply_change find
+    and re-position a single row by bisection.
+    """
+    def __init__(self, rows, key=None):
+        self.rows = rows
+        self.key = key
+        self.on_change = None
+        self._keys = [key(row) for row in rows] if key else []
+        # Row id function and id -> row map, set up by the first find()
+        self._row_id = None
+        self._by_id = None
+    
+    def count(self):
+        return len(self.rows)
+    
+    def get_rows(self, start, count):
+        return self.rows[start:start + count]
+    
+    def apply_change(self, old_row, row, total=None):
+        """Replace `old_row` by `row` (either may be None) at its sorted position"""
+        if old_row is not None:
+            index = bisect.bisect_left(self._keys, self.key(old_row))
+            if index < len(self._keys) and self._keys[index] == self.key(old_row):
+                del self.rows[index]
+                del self._keys[index]
+                del self._by_id[self._row_id(old_row)]
+        if row is not None:
+            key = self.key(row)
+            index = bisect.bisect_left(self._keys, key)
+            self.rows.insert(index, row)
+            self._keys.insert(index, key)
+            self._by_id[self._row_id(row)] = row
+    
+    def find(self, row_id, row_key):
+        """Return the row whose `row_key` is `row_id`, or None"""
+        if self._by_id is None:
+            self._row_id = row_key
+            self._by_id = {row_key(row): row for row in self.rows}
+        return self._by_id.get(row_id)
+
+class PagedSource:
+    """Row source for VirtualTreeview that fetches fixed-size pages on demand.
+    
+    `fetch_page(limit, after=None, before=None, offset=None)` must return rows
+    in display order. Neighbouring pages are fetched by keyset from an
+    already cached page; `offset` is only used when jumping to an uncached
+    position. At most `max_pages` pages are kept in memory.
+    
+    When `submit` is given (see DatabaseExecutor.submit), pages are fetched
+    in the background: `fetch_page` then receives the worker's database as
+    its first argument, missing rows are returned as None placeholders and
+    `on_change` is called once they arrive.
+    
+    `key` must order rows the same way `fetch_page` does; it is used to
+    patch the cache after a single row changes.
+    """
+    def __init__(self, fetch_page, total, key, page_size=100, max_pages=5, submit=None):
+        self.fetch_page = fetch_page
+        self.total = total
+        self.key = key
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.submit = submit
+        self.on_change = None
+        self._pages = OrderedDict()
+        self._requests = {}
+    
+    def count(self):
+        return self.total
+    
+    def get_rows(self, start, count):
+        if count <= 0 or start >= self.total:
+            return []
+        
+        first_page = start // self.page_size
+        last_page = (min(start + count, self.total) - 1) // self.page_size
+        rows = []
+        for page in range(first_page, last_page + 1):
+            rows.extend(self._get_page(page))
+        
+        offset = start - first_page * self.page_size
+        return rows[offset:offset + count]
+    
+    def apply_change(self, old_row, row, total):
+        """Patch the cache after one row changed.
+        
+        `old_row` is the row as cached before the change (None for a new row
+        or one that was not loaded) and `row` its new version (None if it left
+        the source). A row that keeps its position is replaced in place;
+        otherwise only pages at or after the first affected position are
+        dropped, to be refetched by keyset from the page before them.
+        """
+        self.total = total
+        
+        if old_row is not None and row is not None and self.key(old_row) == self.key(row):
+            for rows in self._pages.values():
+                for index, cached in enumerate(rows):
+                    if cached is old_row:
+                        rows[index] = row
+                        return
+        
+        pivots = [self.key(changed) for changed in (old_row, row) if changed is not None]
+        if not pivots:
+            return
+        pivot = min(pivots)
+        for page, rows in list(self._pages.items()):
+            # A short last page may gain rows at its end
+            if len(rows) < self.page_size or self.key(rows[-1]) >= pivot:
+                del self._pages[page]
+        # Requests in flight were positioned against the old layout
+        self.close()
+    
+    def find(self, row_id, row_key):
+        """Return the cached row whose `row_key` is `row_id`, or None"""
+        for rows in self._pages.values():
+            for row in rows:
+                if row_key(row) == row_id:
+                    return row
+        return None
+    
+    def invalidate(self, total):
+        """Drop every cached page, e.g. when the changed row's position is unknown"""
+        self.total = total
+        self._pages.clear()
+        self.close()
+    
+    def close(self):
+        """Cancel any page requests still in flight"""
+        for request in self._requests.values():
+            request.cancel()
+        self._requests.clear()
+    
+    def _get_page(self, page):
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+        
+        previous = self._pages.get(page - 1)
+        following = self._pages.get(page + 1)
+        if previous and len(previous) == self.page_size:
+            position = {"after": previous[-1]}
+        elif following:
+            position = {"before": following[0]}
+        else:
+            position = {"offset": page * self.page_size}
+        
+        if self.submit is None:
+            self._store_page(page, self.fetch_page(self.page_size, **position))
+            return self._pages[page]
+        
+        if page not in self._requests:
+            self._requests[page] = self.submit(
+                self.fetch_page, self.page_size,
+                on_done=lambda rows: self._on_page_loaded(page, rows),
+                interruptible=True,
+                **position
+            )
+        return [None] * min(self.page_size, self.total - page * self.page_size)
+    
+    def _on_page_loaded(self, page, rows):
+        self._requests.pop(page, None)
+        self._store_page(page, rows)
+        if self.on_change:
+            self.on_change()
+    
+    def _store_page(self, page, rows):
+        self._pages[page] = rows
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview that only creates items for the rows currently on screen.
+    
+    Rows come from a source object (see ListSource and PagedSource) and are
+    turned into (values, tags) by `format_row(row, index)`. Scrolling reuses
+    the same Treeview items, so memory and render time do not depend on the
+    number of rows in the source.
+    """
+    def __init__(self, parent, columns, format_row, row_key, row_height=30, **kwargs):
+        ttk.Frame.__init__(self, parent, **kwargs)
+        
+        self.format_row = format_row
+        self.row_key = row_key
+        self.row_height = row_height
+        # Until the first set_source; an empty list is trivially in row_key
+        # order, so a row changed before then can still be placed
+        self.source = ListSource([], row_key)
+        self.first_row = 0
+        self.visible_rows = 1
+        self.selected_key = None
+        self._rows = []
+        
+        self.scrollbar = ttk.Scrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(3))
+        self.tree.bind("<Prior>", lambda event: self._scroll_key(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self._scroll_key(self.visible_rows))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+    
+    def set_source(self, source):
+        """Show rows from a new source, scrolled to the top"""
+        if getattr(self.source, "close", None):
+            self.source.close()
+        self.source = source
+        self.source.on_change = self.refresh
+        self.first_row = 0
+        self.refresh()
+    
+    def refresh(self):
+        """Re-render the visible window from the current source"""
+        total = self.source.count()
+        self.first_row = max(0, min(self.first_row, total - self.visible_rows))
+        self._rows = self.source.get_rows(self.first_row, self.visible_rows)
+        
+        items = self.tree.get_children()
+        # Grow or shrink the pool of reusable items to the window size
+        for index in range(len(items), len(self._rows)):
+            self.tree.insert("", tk.END, iid=f"row{index}")
+        for iid in items[len(self._rows):]:
+            self.tree.delete(iid)
+        
+        selected = None
+        for index, row in enumerate(self._rows):
+            iid = f"row{index}"
+            if row is None:
+                # Page still being fetched in the background
+                self.tree.item(iid, values=("", "Loading..."), tags=())
+                continue
+            values, tags = self.format_row(row, self.first_row + index)
+            self.tree.item(iid, values=values, tags=tags)
+            if self.row_key(row) == self.selected_key:
+                selected = iid
+        
+        self.tree.selection_set((selected,) if selected else ())
+        self._update_scrollbar(total)
+    
+    def apply_change(self, row_id, row, total, is_new=False):
+        """Reflect a single inserted, updated or deleted row.
+        
+        `row` is the row's new version, or None if it no longer belongs in
+        the list. Only the affected row is re-positioned; the visible window
+        is then re-rendered.
+        """
+        old_row = self.source.find(row_id, self.row_key)
+        if old_row is None and not is_new and isinstance(self.source, PagedSource):
+            # The row was somewhere outside the cache, so cached positions may shift
+            self.source.invalidate(total)
+        else:
+            self.source.apply_change(old_row, row, total)
+        
+        if row is not None:
+            self.selected_key = row_id
+        self.refresh()
+    
+    def scroll_to(self, first_row):
+        """Scroll so that `first_row` is the top visible row"""
+        self.first_row = max(0, first_row)
+        self.refresh()
+    
+    def scroll_by(self, rows):
+        self.scroll_to(self.first_row + rows)
+    
+    def selected_row(self):
+        """Return the row currently selected, if it is on screen"""
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        index = self.tree.index(selection[0])
+        return self._rows[index] if index < len(self._rows) else None
+    
+    def _update_scrollbar(self, total):
+        if total <= 0:
+            self.scrollbar.set(0, 1)
+            return
+        first = self.first_row / total
+        last = min(1.0, (self.first_row + self.visible_rows) / total)
+        self.scrollbar.set(first, last)
+    
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(amount) * self.source.count()))
+        elif action == tk.SCROLL:
+            step = self.visible_rows if unit == tk.PAGES else 1
+            self.scroll_by(int(amount) * step)
+    
+    def _on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+    
+    def _scroll_key(self, rows):
+        self.scroll_by(rows)
+        return "break"
+    
+    def _move_selection(self, step):
+        """Keyboard navigation that scrolls the window at its edges"""
+        selection = self.tree.selection()
+        index = self.tree.index(selection[0]) + step if selection else 0
+        if index < 0:
+            self.scroll_by(-1)
+            index = 0
+        elif index >= len(self._rows):
+            self.scroll_by(1)
+            index = len(self._rows) - 1
+        if 0 <= index < len(self._rows) and self._rows[index] is not None:
+            self.selected_key = self.row_key(self._rows[index])
+            self.tree.selection_set((f"row{index}",))
+        return "break"
+    
+    def _on_select(self, event):
+        row = self.selected_row()
+        if row is not None:
+            self.selected_key = self.row_key(row)
+    
+    def _on_resize(self, event):
+        # The heading takes roughly one row of the widget's height
+        visible_rows = max(1, event.height // self.row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
@@ -0,0 +1,55 @@
+import re
+from datetime import datetime
+
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+PHONE_PATTERN = re.compile(r"^[0-9+\-() ]+$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def validate_member(name, phone, email, membership_type, start_date=None, end_date=None,
+                    check_dates=False, membership_types=None):
+    """Validate member fields and return a list of error messages.
+
+    These are the rules MemberForm enforces, shared with the bulk importer.
+    Dates are only checked when `check_dates` is set; `membership_types`, if
+    given, is the collection of valid plan names.
+    """
+    errors = []
+
+    # Name validation
+    if not name:
+        errors.append("Name is required")
+
+    # Email validation (if provided)
+    if email and not EMAIL_PATTERN.match(email):
+        errors.append("Invalid email format")
+
+    # Phone validation (basic)
+    if phone and not PHONE_PATTERN.match(phone):
+        errors.append("Phone number should contain only digits, +, -, (, ) and spaces")
+
+    # Membership type validation
+    if not membership_type:
+        errors.append("Please select a membership type")
+    elif membership_types is not None and membership_type not in membership_types:
+        errors.append(f"Unknown membership type: {membership_type}")
+
+    if check_dates:
+        start = _parse_date(start_date, "Start date", errors)
+        end = _parse_date(end_date, "End date", errors)
+
+        # Validate that end date is after start date
+        if start and end and end < start:
+            errors.append("End date must be after start date")
+
+    return errors
+
+def _parse_date(value, label, errors):
+    """Parse a YYYY-MM-DD date, recording an error and returning None if invalid"""
+    if not DATE_PATTERN.match(value or ""):
+        errors.append(f"{label} must be in YYYY-MM-DD format")
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        errors.append(f"{label} is not a valid date")
+        return None